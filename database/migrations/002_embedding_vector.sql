@@ -0,0 +1,15 @@
+-- Store speaker embeddings as pgvector vector(192) instead of FLOAT8[192]
+-- Halves storage (float4) and lets PostgREST exchange embeddings as a single
+-- compact "[x,y,...]" literal instead of a JSON array of float8 values
+
+BEGIN;
+
+-- Enable pgvector (available on Supabase as the "vector" extension)
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE users
+    ALTER COLUMN embedding TYPE vector(192) USING embedding::real[]::vector(192);
+
+COMMENT ON COLUMN users.embedding IS '192-dimensional speaker embedding from SpeechBrain ECAPA-TDNN (float4 pgvector)';
+
+COMMIT;
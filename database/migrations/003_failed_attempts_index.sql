@@ -0,0 +1,7 @@
+-- Partial index serving the recent-failed-attempts count used for rate limiting
+-- (phone = ? AND success = false AND created_at >= ?) as an index-only range scan
+-- Run outside a transaction: CREATE INDEX CONCURRENTLY cannot run inside BEGIN/COMMIT
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_auth_attempts_phone_failed_created
+    ON auth_attempts (phone, created_at DESC)
+    WHERE success = false;
@@ -0,0 +1,51 @@
+-- Add an int8-quantized copy of each speaker embedding for the verification
+-- read path: 192 bytes plus one float4 scale (embedding ~= int8 * scale)
+-- instead of the ~2 KB "[x,y,...]" vector literal PostgREST returns.
+-- The float4 embedding column stays the source of truth; the service writes
+-- both on enrollment. Deploy together with the service version that writes
+-- embedding_int8/embedding_scale (the columns are NOT NULL after backfill).
+
+BEGIN;
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS embedding_int8 BYTEA,
+    ADD COLUMN IF NOT EXISTS embedding_scale REAL;
+
+-- Backfill: symmetric per-vector scale max(|x|) / 127, values stored as
+-- two's-complement bytes in dimension order
+WITH elems AS (
+    SELECT u.phone, e.x, e.ord
+    FROM users u, unnest(u.embedding::real[]) WITH ORDINALITY AS e(x, ord)
+),
+scales AS (
+    SELECT phone, GREATEST(max(abs(x)), 1e-12) / 127 AS scale
+    FROM elems
+    GROUP BY phone
+),
+quantized AS (
+    SELECT
+        e.phone,
+        s.scale,
+        decode(
+            string_agg(lpad(to_hex((round(e.x / s.scale)::int + 256) % 256), 2, '0'), '' ORDER BY e.ord),
+            'hex'
+        ) AS data
+    FROM elems e
+    JOIN scales s USING (phone)
+    GROUP BY e.phone, s.scale
+)
+UPDATE users u
+SET embedding_int8 = q.data,
+    embedding_scale = q.scale
+FROM quantized q
+WHERE u.phone = q.phone;
+
+ALTER TABLE users
+    ALTER COLUMN embedding_int8 SET NOT NULL,
+    ALTER COLUMN embedding_scale SET NOT NULL,
+    ADD CONSTRAINT users_embedding_int8_length CHECK (octet_length(embedding_int8) = 192);
+
+COMMENT ON COLUMN users.embedding_int8 IS 'int8-quantized embedding (192 bytes); embedding ~= embedding_int8 * embedding_scale';
+COMMENT ON COLUMN users.embedding_scale IS 'Per-vector dequantization scale for embedding_int8 (max(|embedding|) / 127)';
+
+COMMIT;
@@ -4,11 +4,16 @@
 -- Enable the uuid-ossp extension for UUID generation
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Enable pgvector for compact float4 embedding storage
+CREATE EXTENSION IF NOT EXISTS vector;
+
 -- Users table for storing voice enrollment data
 CREATE TABLE IF NOT EXISTS users (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     phone TEXT UNIQUE NOT NULL,
-    embedding FLOAT8[192] NOT NULL,
+    embedding vector(192) NOT NULL,
+    embedding_int8 BYTEA NOT NULL CHECK (octet_length(embedding_int8) = 192),
+    embedding_scale REAL NOT NULL,
     enrolled_at TIMESTAMPTZ DEFAULT NOW()
 );
 
@@ -43,6 +48,8 @@ COMMENT ON TABLE users IS 'Stores user voice enrollment data with speaker embedd
 COMMENT ON COLUMN users.id IS 'Unique identifier for the user';
 COMMENT ON COLUMN users.phone IS 'User phone number (unique)';
 COMMENT ON COLUMN users.embedding IS '192-dimensional speaker embedding from SpeechBrain ECAPA-TDNN';
+COMMENT ON COLUMN users.embedding_int8 IS 'int8-quantized embedding (192 bytes); embedding ~= embedding_int8 * embedding_scale';
+COMMENT ON COLUMN users.embedding_scale IS 'Per-vector dequantization scale for embedding_int8 (max(|embedding|) / 127)';
 COMMENT ON COLUMN users.enrolled_at IS 'Timestamp when user was enrolled';
 
 COMMENT ON TABLE auth_attempts IS 'Logs all authentication attempts for auditing';
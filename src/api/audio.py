@@ -1,7 +1,9 @@
 """Audio processing API endpoints."""
 
+import asyncio
 import logging
-from typing import Dict, Any
+import shutil
+from typing import Dict, Any, Optional
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel, HttpUrl
@@ -41,23 +43,46 @@ class AudioTestResponse(BaseModel):
     ffmpeg_available: bool
 
 
+# Result of the ffmpeg probe, computed on first use
+_ffmpeg_available: Optional[bool] = None
+
+
+async def _probe_ffmpeg() -> bool:
+    """Check once per process whether a working ffmpeg binary is on PATH."""
+    global _ffmpeg_available
+    if _ffmpeg_available is not None:
+        return _ffmpeg_available
+    
+    if shutil.which('ffmpeg') is None:
+        _ffmpeg_available = False
+        return False
+    
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-version',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            returncode = await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        _ffmpeg_available = returncode == 0
+    except Exception:
+        _ffmpeg_available = False
+    return _ffmpeg_available
+
+
 @router.get("/test", response_model=AudioTestResponse)
 async def test_audio_processing() -> AudioTestResponse:
     """Test audio processing capabilities."""
-    try:
-        # Test if ffmpeg is available
-        import subprocess
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True, timeout=5)
-        ffmpeg_available = result.returncode == 0
-    except Exception:
-        ffmpeg_available = False
-    
     return AudioTestResponse(
         status="ok",
         message="Audio processing test completed",
         audio_utils_available=True,
-        ffmpeg_available=ffmpeg_available
+        ffmpeg_available=await _probe_ffmpeg()
     )
 
 
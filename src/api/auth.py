@@ -4,53 +4,111 @@ Authentication API endpoints for voice enrollment and verification.
 
 import logging
 import time
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
 
 import structlog
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 
 from src.models.api_models import (
     EnrollmentRequest,
     EnrollmentResponse,
     VerificationRequest,
-    VerificationResponse,
-    ErrorResponse
+    VerificationResponse
+)
+from src.services.auth_service import (
+    get_auth_service,
+    EnrollmentError,
+    EnrollmentDownloadError,
+    EnrollmentAudioProcessingError,
+    EnrollmentStorageError,
+    VerificationError,
+    VerificationConnectionError,
+    VerificationAudioError
 )
-from src.services.auth_service import get_auth_service, EnrollmentError, VerificationError
 from src.observability import (
     trace_function,
     record_enrollment_metrics,
     record_verification_metrics
 )
+from src.config import settings
+from src.utils.cache import TTLCache
+from src.utils.time_utils import utc_now_iso
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/v1", tags=["authentication"])
 
+# HTTP status code and error type for each service exception; lookups walk the
+# exception's MRO so the base classes act as fallbacks
+_ENROLLMENT_ERROR_MAP: Dict[type, Tuple[int, str]] = {
+    EnrollmentDownloadError: (400, "AudioDownloadError"),          # invalid audio URL
+    EnrollmentAudioProcessingError: (422, "AudioProcessingError"),  # audio conversion failed
+    EnrollmentStorageError: (500, "DatabaseError"),                 # database operation failed
+    EnrollmentError: (400, "EnrollmentError"),
+}
+_VERIFICATION_ERROR_MAP: Dict[type, Tuple[int, str]] = {
+    VerificationConnectionError: (400, "ConnectionError"),          # WebSocket connection failed
+    VerificationAudioError: (422, "AudioProcessingError"),          # audio capture/processing failed
+    VerificationError: (500, "VerificationError"),
+}
+
+# Fixed error bodies; handlers add correlation_id and timestamp per request
+_ENROLLMENT_INTERNAL_ERROR = {
+    "error": "InternalServerError",
+    "message": "An unexpected error occurred during enrollment"
+}
+_VERIFICATION_INTERNAL_ERROR = {
+    "error": "InternalServerError",
+    "message": "An unexpected error occurred during verification"
+}
+_AUTH_HISTORY_INTERNAL_ERROR = {
+    "error": "InternalServerError",
+    "message": "Failed to retrieve authentication history"
+}
+
+# Last component check results (db_healthy, embedding_info) so frequent health
+# probes don't each issue a database round trip; a TTL of 0 or less disables it
+_health_cache: Optional[TTLCache[Tuple[bool, Dict[str, Any]]]] = (
+    TTLCache(maxsize=1, ttl=settings.health_check_cache_ttl)
+    if settings.health_check_cache_ttl > 0 else None
+)
+
+
+def _classify_error(error: Exception, error_map: Dict[type, Tuple[int, str]]) -> Tuple[int, str]:
+    """Look up the (status_code, error_type) for an exception by its class hierarchy."""
+    for cls in type(error).__mro__:
+        if cls in error_map:
+            return error_map[cls]
+    return 500, "InternalServerError"
+
 
 def create_error_response(
     error_type: str,
     message: str,
     correlation_id: str,
     status_code: int = 500
-) -> JSONResponse:
-    """Create standardized error response."""
-    error_response = ErrorResponse(
-        error=error_type,
-        message=message,
-        correlation_id=correlation_id,
-        timestamp=datetime.utcnow()
-    )
-    return JSONResponse(
+) -> ORJSONResponse:
+    """Create standardized error response (same shape as ErrorResponse)."""
+    return ORJSONResponse(
         status_code=status_code,
-        content=error_response.model_dump()
+        content={
+            "error": error_type,
+            "message": message,
+            "correlation_id": correlation_id,
+            "timestamp": datetime.now(timezone.utc)
+        }
     )
 
 
 @router.post("/enroll-user", response_model=EnrollmentResponse)
 @trace_function("enrollment_endpoint")
-async def enroll_user(request: EnrollmentRequest, http_request: Request) -> EnrollmentResponse:
+async def enroll_user(
+    request: EnrollmentRequest,
+    http_request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks
+) -> EnrollmentResponse:
     """
     Enroll a user for voice authentication.
     
@@ -59,8 +117,10 @@ async def enroll_user(request: EnrollmentRequest, http_request: Request) -> Enro
     record in database.
     
     Args:
-        request: Enrollment request containing userId, phone, and audioUrl
+        request: Enrollment request containing phone and audioUrl
         http_request: HTTP request for correlation ID extraction
+        response: Outgoing response, used to set the X-Cache header
+        background_tasks: Runs metrics and completion logging after the response is sent
         
     Returns:
         EnrollmentResponse with status and confidence score
@@ -72,37 +132,35 @@ async def enroll_user(request: EnrollmentRequest, http_request: Request) -> Enro
     auth_service = get_auth_service()
     start_time = time.time()
     
-    logger.info(
-        "Enrollment request received",
-        user_id=str(request.userId),
-        phone=request.phone,
-        audio_url=request.audioUrl,
-        correlation_id=correlation_id
-    )
+    # Bind request identifiers once; every log line below inherits them
+    structlog.contextvars.bind_contextvars(correlation_id=correlation_id, phone=request.phone)
+    
+    logger.info("Enrollment request received", audio_url=request.audioUrl)
     
     try:
         # Perform user enrollment
-        status, score = await auth_service.enroll_user(
+        status, score, cache_hit = await auth_service.enroll_user(
             phone=request.phone,
             audio_url=request.audioUrl
         )
         
-        # Record metrics
+        # Record metrics and log after the response has been sent
         processing_time = time.time() - start_time
-        record_enrollment_metrics(
+        background_tasks.add_task(
+            record_enrollment_metrics,
             success=True,
             processing_time=processing_time,
             phone=request.phone
         )
         
-        logger.info(
+        background_tasks.add_task(
+            logger.info,
             "Enrollment completed successfully",
-            phone=request.phone,
             status=status,
-            score=score,
-            correlation_id=correlation_id
+            score=score
         )
         
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         return EnrollmentResponse(status=status, score=score)
         
     except EnrollmentError as e:
@@ -117,24 +175,10 @@ async def enroll_user(request: EnrollmentRequest, http_request: Request) -> Enro
         error_message = str(e)
         logger.error(
             "Enrollment failed",
-            phone=request.phone,
-            error=error_message,
-            correlation_id=correlation_id
+            error=error_message
         )
         
-        # Determine appropriate status code based on error type
-        if "download" in error_message.lower():
-            status_code = 400  # Bad Request - invalid audio URL
-            error_type = "AudioDownloadError"
-        elif "conversion" in error_message.lower() or "processing" in error_message.lower():
-            status_code = 422  # Unprocessable Entity - audio conversion failed
-            error_type = "AudioProcessingError"
-        elif "store" in error_message.lower() or "database" in error_message.lower():
-            status_code = 500  # Internal Server Error - database operation failed
-            error_type = "DatabaseError"
-        else:
-            status_code = 400  # Bad Request - general enrollment error
-            error_type = "EnrollmentError"
+        status_code, error_type = _classify_error(e, _ENROLLMENT_ERROR_MAP)
         
         raise HTTPException(
             status_code=status_code,
@@ -142,7 +186,7 @@ async def enroll_user(request: EnrollmentRequest, http_request: Request) -> Enro
                 "error": error_type,
                 "message": error_message,
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
         )
         
@@ -150,25 +194,26 @@ async def enroll_user(request: EnrollmentRequest, http_request: Request) -> Enro
         error_message = f"Unexpected error during enrollment: {str(e)}"
         logger.error(
             "Unexpected enrollment error",
-            phone=request.phone,
-            error=error_message,
-            correlation_id=correlation_id
+            error=error_message
         )
         
         raise HTTPException(
             status_code=500,
             detail={
-                "error": "InternalServerError",
-                "message": "An unexpected error occurred during enrollment",
+                **_ENROLLMENT_INTERNAL_ERROR,
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
         )
 
 
 @router.post("/verify-password", response_model=VerificationResponse)
 @trace_function("verification_endpoint")
-async def verify_password(request: VerificationRequest, http_request: Request) -> VerificationResponse:
+async def verify_password(
+    request: VerificationRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks
+) -> VerificationResponse:
     """
     Verify user identity through voice authentication.
     
@@ -176,8 +221,9 @@ async def verify_password(request: VerificationRequest, http_request: Request) -
     compares with stored user embedding, and returns verification result.
     
     Args:
-        request: Verification request containing userId and listenUrl
+        request: Verification request containing phone and listenUrl
         http_request: HTTP request for correlation ID extraction
+        background_tasks: Runs metrics and completion logging after the response is sent
         
     Returns:
         VerificationResponse with success status, message, and similarity score
@@ -189,12 +235,10 @@ async def verify_password(request: VerificationRequest, http_request: Request) -
     auth_service = get_auth_service()
     start_time = time.time()
     
-    logger.info(
-        "Verification request received",
-        user_id=str(request.userId),
-        listen_url=request.listenUrl,
-        correlation_id=correlation_id
-    )
+    # Bind request identifiers once; every log line below inherits them
+    structlog.contextvars.bind_contextvars(correlation_id=correlation_id, phone=request.phone)
+    
+    logger.info("Verification request received", listen_url=request.listenUrl)
     
     try:
         # Perform user verification
@@ -203,21 +247,21 @@ async def verify_password(request: VerificationRequest, http_request: Request) -
             listen_url=request.listenUrl
         )
         
-        # Record metrics
+        # Record metrics and log after the response has been sent
         processing_time = time.time() - start_time
-        record_verification_metrics(
+        background_tasks.add_task(
+            record_verification_metrics,
             success=success,
             processing_time=processing_time,
             similarity_score=score,
             phone=request.phone
         )
         
-        logger.info(
+        background_tasks.add_task(
+            logger.info,
             "Verification completed",
-            phone=request.phone,
             success=success,
-            score=score,
-            correlation_id=correlation_id
+            score=score
         )
         
         # For successful verification, we could return user records here
@@ -248,24 +292,10 @@ async def verify_password(request: VerificationRequest, http_request: Request) -
         error_message = str(e)
         logger.error(
             "Verification failed",
-            phone=request.phone,
-            error=error_message,
-            correlation_id=correlation_id
+            error=error_message
         )
         
-        # Determine appropriate status code based on error type
-        if "connect" in error_message.lower() or "websocket" in error_message.lower():
-            status_code = 400  # Bad Request - WebSocket connection failed
-            error_type = "ConnectionError"
-        elif "capture" in error_message.lower() or "audio" in error_message.lower():
-            status_code = 422  # Unprocessable Entity - audio capture/processing failed
-            error_type = "AudioProcessingError"
-        elif "user" in error_message.lower() and "not" in error_message.lower():
-            status_code = 404  # Not Found - user not enrolled
-            error_type = "UserNotFoundError"
-        else:
-            status_code = 500  # Internal Server Error - general verification error
-            error_type = "VerificationError"
+        status_code, error_type = _classify_error(e, _VERIFICATION_ERROR_MAP)
         
         raise HTTPException(
             status_code=status_code,
@@ -273,7 +303,7 @@ async def verify_password(request: VerificationRequest, http_request: Request) -
                 "error": error_type,
                 "message": error_message,
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
         )
         
@@ -281,22 +311,40 @@ async def verify_password(request: VerificationRequest, http_request: Request) -
         error_message = f"Unexpected error during verification: {str(e)}"
         logger.error(
             "Unexpected verification error",
-            phone=request.phone,
-            error=error_message,
-            correlation_id=correlation_id
+            error=error_message
         )
         
         raise HTTPException(
             status_code=500,
             detail={
-                "error": "InternalServerError",
-                "message": "An unexpected error occurred during verification",
+                **_VERIFICATION_INTERNAL_ERROR,
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
         )
 
 
+async def _check_components() -> Tuple[bool, Dict[str, Any]]:
+    """Return (db_healthy, embedding_info), reusing results for the cache TTL."""
+    if _health_cache is not None:
+        cached = _health_cache.get("components")
+        if cached is not None:
+            return cached
+    
+    auth_service = get_auth_service()
+    
+    # Check database connectivity
+    db_healthy = await auth_service.db.health_check()
+    
+    # Check embedding service
+    embedding_info = auth_service.embedding_service.get_model_info()
+    
+    result = (db_healthy, embedding_info)
+    if _health_cache is not None:
+        _health_cache.set("components", result)
+    return result
+
+
 @router.get("/health", response_model=Dict[str, Any])
 async def auth_health_check() -> Dict[str, Any]:
     """
@@ -305,21 +353,15 @@ async def auth_health_check() -> Dict[str, Any]:
     Returns:
         Dict with service health status and component checks
     """
-    auth_service = get_auth_service()
-    
     try:
-        # Check database connectivity
-        db_healthy = await auth_service.db.health_check()
-        
-        # Check embedding service
-        embedding_info = auth_service.embedding_service.get_model_info()
+        db_healthy, embedding_info = await _check_components()
         embedding_healthy = embedding_info.get("model_loaded", False)
         
         overall_healthy = db_healthy and embedding_healthy
         
         return {
             "status": "healthy" if overall_healthy else "unhealthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now_iso(),
             "components": {
                 "database": {
                     "status": "healthy" if db_healthy else "unhealthy",
@@ -336,7 +378,7 @@ async def auth_health_check() -> Dict[str, Any]:
         logger.error("Health check failed", error=str(e))
         return {
             "status": "unhealthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now_iso(),
             "error": str(e)
         }
 
@@ -389,9 +431,8 @@ async def get_user_auth_history(
         raise HTTPException(
             status_code=500,
             detail={
-                "error": "InternalServerError",
-                "message": "Failed to retrieve authentication history",
+                **_AUTH_HISTORY_INTERNAL_ERROR,
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
         )
\ No newline at end of file
@@ -12,6 +12,12 @@ from src.clients.vapi_client import (
     VAPIAudioError
 )
 
+try:
+    import websockets  # noqa: F401
+    _WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    _WEBSOCKETS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/vapi", tags=["vapi"])
@@ -45,17 +51,10 @@ class VAPITestResponse(BaseModel):
 @router.get("/test", response_model=VAPITestResponse)
 async def test_vapi_client() -> VAPITestResponse:
     """Test VAPI WebSocket client availability."""
-    try:
-        # Test if websockets library is available
-        import websockets
-        websocket_available = True
-    except ImportError:
-        websocket_available = False
-    
     return VAPITestResponse(
         status="ok",
         message="VAPI client test completed",
-        websocket_client_available=websocket_available
+        websocket_client_available=_WEBSOCKETS_AVAILABLE
     )
 
 
@@ -3,65 +3,68 @@ VAPI webhook handler for voice authentication.
 """
 
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
+import orjson
 import structlog
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
+from src.config import settings
 from src.services.auth_service import get_auth_service, VerificationError
 from src.observability import trace_function, record_verification_metrics
+from src.utils.time_utils import utc_now_iso
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/v1", tags=["vapi-webhook"])
 
 
-def extract_phone_from_vapi_payload(payload: Dict[str, Any]) -> Optional[str]:
-    """Extract phone number from VAPI webhook payload."""
-    try:
-        # Try to get phone from customer object in call
-        call_data = payload.get("message", {}).get("call", {})
-        customer = call_data.get("customer", {})
-        
-        if customer and "number" in customer:
-            return customer["number"]
-        
-        # Try alternative path
-        customer_alt = payload.get("message", {}).get("customer", {})
-        if customer_alt and "number" in customer_alt:
-            return customer_alt["number"]
-            
-        # Log the payload structure for debugging
-        logger.warning("Could not extract phone number from VAPI payload", payload_keys=list(payload.keys()))
-        return None
-        
-    except Exception as e:
-        logger.error("Error extracting phone from VAPI payload", error=str(e))
-        return None
+def _object_field(obj: Dict[str, Any], key: str) -> Dict[str, Any]:
+    """Return obj[key] if it is a JSON object, else an empty dict."""
+    value = obj.get(key)
+    return value if isinstance(value, dict) else {}
 
 
-def extract_listen_url_from_vapi_payload(payload: Dict[str, Any]) -> Optional[str]:
-    """Extract WebSocket listen URL from VAPI webhook payload."""
-    try:
-        # Get monitor data from call
-        call_data = payload.get("message", {}).get("call", {})
-        monitor = call_data.get("monitor", {})
-        
-        if monitor and "listenUrl" in monitor:
-            return monitor["listenUrl"]
-            
-        logger.warning("Could not extract listen URL from VAPI payload")
-        return None
+def _parse_vapi_payload(payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract phone number and WebSocket listen URL from a VAPI webhook payload.
+    
+    The phone number is read from message.call.customer, falling back to
+    message.customer; the listen URL from message.call.monitor.
+    
+    Args:
+        payload: Parsed webhook JSON body
         
-    except Exception as e:
-        logger.error("Error extracting listen URL from VAPI payload", error=str(e))
-        return None
+    Returns:
+        Tuple of (phone, listen_url); either may be None if absent
+    """
+    # Fields of the wrong JSON type are treated as absent, so malformed payloads
+    # get the same 400 as missing ones
+    message = _object_field(payload, "message")
+    call = _object_field(message, "call")
+    
+    phone = _object_field(call, "customer").get("number") or _object_field(message, "customer").get("number")
+    listen_url = _object_field(call, "monitor").get("listenUrl")
+    
+    return phone, listen_url
+
+
+def _payload_too_large_response(correlation_id: str) -> ORJSONResponse:
+    """Build the 413 response for webhook bodies over the configured limit."""
+    logger.error("VAPI webhook body too large")
+    return ORJSONResponse(
+        status_code=413,
+        content={
+            "error": "PayloadTooLarge",
+            "message": f"Webhook body exceeds {settings.webhook_max_body_bytes} bytes",
+            "correlation_id": correlation_id
+        }
+    )
 
 
 @router.post("/vapi-webhook")
 @trace_function("vapi_webhook")
-async def handle_vapi_webhook(request: Request) -> JSONResponse:
+async def handle_vapi_webhook(request: Request) -> ORJSONResponse:
     """
     Handle VAPI webhook for voice authentication.
     
@@ -70,16 +73,45 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
     """
     correlation_id = request.headers.get("X-Call-ID", "unknown")
     
+    # Bind request identifiers once; every log line below inherits them
+    structlog.contextvars.bind_contextvars(correlation_id=correlation_id)
+    
+    # Reject oversized bodies before reading them when the client declares a length
+    try:
+        content_length = int(request.headers.get("content-length", 0))
+    except ValueError:
+        content_length = 0
+    if content_length > settings.webhook_max_body_bytes:
+        return _payload_too_large_response(correlation_id)
+    
     try:
         # Parse webhook payload
-        payload = await request.json()
-        logger.info("Received VAPI webhook", correlation_id=correlation_id)
+        body = await request.body()
+        if len(body) > settings.webhook_max_body_bytes:
+            return _payload_too_large_response(correlation_id)
         
-        # Extract phone number from payload
-        phone = extract_phone_from_vapi_payload(payload)
+        try:
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            logger.error("Invalid JSON in VAPI webhook", error=str(e))
+            return ORJSONResponse(
+                status_code=400,
+                content={
+                    "error": "InvalidJSON",
+                    "message": "Webhook body is not valid JSON",
+                    "correlation_id": correlation_id
+                }
+            )
+        if not isinstance(payload, dict):
+            payload = {}
+        
+        logger.info("Received VAPI webhook")
+        
+        # Extract phone number and listen URL from payload
+        phone, listen_url = _parse_vapi_payload(payload)
         if not phone:
-            logger.error("Could not extract phone number from VAPI payload", correlation_id=correlation_id)
-            return JSONResponse(
+            logger.error("Could not extract phone number from VAPI payload")
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "error": "MissingPhoneNumber",
@@ -88,11 +120,9 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
                 }
             )
         
-        # Extract listen URL from payload
-        listen_url = extract_listen_url_from_vapi_payload(payload)
         if not listen_url:
-            logger.error("Could not extract listen URL from VAPI payload", correlation_id=correlation_id)
-            return JSONResponse(
+            logger.error("Could not extract listen URL from VAPI payload")
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "error": "MissingListenURL",
@@ -101,12 +131,8 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
                 }
             )
         
-        logger.info(
-            "Processing VAPI verification request",
-            phone=phone,
-            listen_url=listen_url,
-            correlation_id=correlation_id
-        )
+        structlog.contextvars.bind_contextvars(phone=phone)
+        logger.info("Processing VAPI verification request", listen_url=listen_url)
         
         # Process voice verification
         auth_service = get_auth_service()
@@ -127,10 +153,8 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
             
             logger.info(
                 "VAPI verification completed",
-                phone=phone,
                 success=success,
-                score=score,
-                correlation_id=correlation_id
+                score=score
             )
             
             # Return response that VAPI can use
@@ -140,7 +164,7 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
                 "score": score,
                 "phone": phone,
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
             
             if success:
@@ -148,7 +172,7 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
                 # response_content["user_data"] = await get_user_data(phone)
                 pass
             
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=200,
                 content=response_content
             )
@@ -157,9 +181,7 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
             error_message = str(e)
             logger.error(
                 "VAPI verification failed",
-                phone=phone,
-                error=error_message,
-                correlation_id=correlation_id
+                error=error_message
             )
             
             # Record failed metrics
@@ -171,7 +193,7 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
             )
             
             # Return error response for VAPI
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "success": False,
@@ -179,31 +201,30 @@ async def handle_vapi_webhook(request: Request) -> JSONResponse:
                     "message": error_message,
                     "phone": phone,
                     "correlation_id": correlation_id,
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": utc_now_iso()
                 }
             )
             
     except Exception as e:
         logger.error(
             "Unexpected error in VAPI webhook",
-            error=str(e),
-            correlation_id=correlation_id
+            error=str(e)
         )
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "success": False,
                 "error": "InternalServerError",
                 "message": "An unexpected error occurred during verification",
                 "correlation_id": correlation_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": utc_now_iso()
             }
         )
 
 
 @router.post("/vapi-webhook/debug")
-async def debug_vapi_payload(request: Request) -> JSONResponse:
+async def debug_vapi_payload(request: Request) -> ORJSONResponse:
     """
     Debug endpoint to inspect VAPI webhook payloads.
     
@@ -216,8 +237,7 @@ async def debug_vapi_payload(request: Request) -> JSONResponse:
         payload = await request.json()
         
         # Extract key information
-        phone = extract_phone_from_vapi_payload(payload)
-        listen_url = extract_listen_url_from_vapi_payload(payload)
+        phone, listen_url = _parse_vapi_payload(payload)
         
         debug_info = {
             "extracted_phone": phone,
@@ -230,19 +250,19 @@ async def debug_vapi_payload(request: Request) -> JSONResponse:
             },
             "full_payload": payload,
             "correlation_id": correlation_id,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utc_now_iso()
         }
         
         logger.info("VAPI webhook debug", debug_info=debug_info)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content=debug_info
         )
         
     except Exception as e:
         logger.error("Error in debug endpoint", error=str(e), correlation_id=correlation_id)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "error": str(e),
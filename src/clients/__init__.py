@@ -4,7 +4,8 @@ from src.clients.supabase_client import (
     SupabaseClient,
     UserRepository,
     AuthAttemptRepository,
-    DatabaseManager
+    DatabaseManager,
+    get_database_manager
 )
 
 from src.clients.vapi_client import (
@@ -19,6 +20,7 @@ __all__ = [
     "UserRepository", 
     "AuthAttemptRepository",
     "DatabaseManager",
+    "get_database_manager",
     "VAPIWebSocketClient",
     "VAPIConnectionError",
     "VAPIAudioError",
@@ -2,19 +2,111 @@
 
 import asyncio
 import logging
-from datetime import datetime
-from typing import List, Optional
+import random
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
+import orjson
 from supabase import create_client, Client
 from postgrest.exceptions import APIError
 
 from src.config import settings
-from src.models.internal_models import User, AuthAttempt
+from src.models.internal_models import User, UserSummary, AuthAttempt
+from src.utils.cache import TTLCache
+
+# Optional: direct Postgres reads for the verification hot path (see
+# SupabaseClient.get_pool); everything falls back to PostgREST without it
+try:
+    import asyncpg
+    _ASYNCPG_AVAILABLE = True
+except ImportError:
+    _ASYNCPG_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _get_client(url: str, key: str) -> Client:
+    """Create one Supabase client per (url, key) and share it process-wide."""
+    return create_client(url, key)
+
+
+# Columns needed to rebuild a User; avoids pulling unused columns over the wire.
+# Reads use the int8-quantized embedding (192 bytes + scale, see
+# _quantize_embedding) rather than the float4 vector column.
+_USER_COLUMNS = "phone,embedding_int8,embedding_scale,enrolled_at"
+_USER_SUMMARY_COLUMNS = "phone,enrolled_at"
+
+
+def _encode_embedding(embedding: np.ndarray) -> str:
+    """Encode an embedding as a pgvector literal ("[x,y,...]") of float32 values."""
+    return orjson.dumps(embedding.astype(np.float32, copy=False),
+                        option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _quantize_embedding(embedding: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Quantize an embedding to int8 with a symmetric per-vector scale.
+    
+    Cosine similarity is scale-invariant and the rounding error (at most
+    scale / 2 per dimension) is far below what moves a speaker verification
+    score, so the quantized vector scores like the original.
+    
+    Returns:
+        Tuple of (int8 values, scale) with embedding ~= values * scale
+    """
+    embedding = embedding.astype(np.float32, copy=False)
+    scale = max(float(np.max(np.abs(embedding))), 1e-12) / 127.0
+    return np.round(embedding / scale).astype(np.int8), scale
+
+
+def _encode_quantized_embedding(embedding: np.ndarray) -> Dict[str, Any]:
+    """Encode an embedding as embedding_int8 (PostgREST bytea hex) and embedding_scale columns."""
+    values, scale = _quantize_embedding(embedding)
+    return {"embedding_int8": "\\x" + values.tobytes().hex(), "embedding_scale": scale}
+
+
+def _decode_quantized_embedding(data: Union[str, bytes], scale: float) -> np.ndarray:
+    """
+    Dequantize an embedding_int8 column value into a float32 array.
+    
+    PostgREST returns bytea as a "\\x..." hex string; asyncpg returns bytes.
+    
+    Raises:
+        ValueError: If the value is not exactly 192 bytes
+    """
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:])
+    if len(data) != 192:
+        raise ValueError(f"Stored embedding must be 192 bytes, got {len(data)}")
+    return np.frombuffer(data, dtype=np.int8).astype(np.float32) * np.float32(scale)
+
+
+# SQLSTATE classes that fail the same way on every retry: data exceptions,
+# integrity constraint violations (e.g. unique violations), syntax/permission
+_NON_RETRYABLE_SQLSTATE_CLASSES = ("22", "23", "42")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Decide whether a failed database call is worth retrying.
+    
+    PostgREST request errors (PGRST codes), deterministic SQL errors and HTTP
+    4xx responses other than 429 are not; network failures and 5xx/429 are.
+    """
+    if not isinstance(error, APIError):
+        return True
+    
+    code = str(error.code or "")
+    if code.startswith("PGRST") or (len(code) == 5 and code[:2] in _NON_RETRYABLE_SQLSTATE_CLASSES):
+        return False
+    if len(code) == 3 and code.isdigit():
+        return code == "429" or not code.startswith("4")
+    return True
+
+
 class SupabaseClient:
     """Client for Supabase database operations."""
     
@@ -23,19 +115,73 @@ class SupabaseClient:
         self._client: Optional[Client] = None
         self._url = settings.supabase_url
         self._key = settings.supabase_anon_key
+        
+        # Direct Postgres pool, used for hot-path reads when DATABASE_URL is set
+        self._dsn = settings.database_url
+        self._pool: Optional["asyncpg.Pool"] = None
+        self._pool_lock = asyncio.Lock()
+        if self._dsn and not _ASYNCPG_AVAILABLE:
+            logger.warning("DATABASE_URL is set but asyncpg is not installed; using PostgREST for all queries")
+    
+    @property
+    def direct_sql_enabled(self) -> bool:
+        """Whether hot-path reads go straight to Postgres instead of PostgREST."""
+        return bool(self._dsn) and _ASYNCPG_AVAILABLE
+    
+    async def get_pool(self) -> "asyncpg.Pool":
+        """
+        Get or create the direct Postgres connection pool.
+        
+        Statement caching is disabled so the pool works through Supabase's
+        pgbouncer-based pooler (transaction mode).
+        """
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self._dsn,
+                        min_size=settings.database_pool_min_size,
+                        max_size=settings.database_pool_max_size,
+                        max_inactive_connection_lifetime=300,
+                        command_timeout=60,
+                        statement_cache_size=0
+                    )
+                    logger.info("Created direct Postgres connection pool")
+        return self._pool
+    
+    async def close(self) -> None:
+        """Close the direct Postgres pool, if one was opened."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
     
     @property
     def client(self) -> Client:
         """Get or create Supabase client instance."""
         if self._client is None:
-            self._client = create_client(self._url, self._key)
+            self._client = _get_client(self._url, self._key)
         return self._client
     
+    async def execute(self, query: Any) -> Any:
+        """
+        Execute a PostgREST query builder off the event loop.
+        
+        supabase-py's client is synchronous; running execute() in a worker
+        thread keeps the blocking HTTP round trip from stalling other requests.
+        
+        Args:
+            query: Query builder returned by client.table(...)
+            
+        Returns:
+            The query's APIResponse
+        """
+        return await asyncio.to_thread(query.execute)
+    
     async def health_check(self) -> bool:
         """Check if database connection is healthy."""
         try:
             # Simple query to test connection
-            result = self.client.table("users").select("count", count="exact").limit(0).execute()
+            await self.execute(self.client.table("users").select("count", count="exact").limit(0))
             return True
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
@@ -48,29 +194,36 @@ class UserRepository:
     def __init__(self, supabase_client: SupabaseClient):
         """Initialize repository with Supabase client."""
         self.client = supabase_client
+        
+        # Recent lookups by phone, so repeat attempts from the same caller skip
+        # the round trip. Users are not mutated after
+        # construction, so entries are shared by reference.
+        self._user_cache: TTLCache[User] = TTLCache(
+            maxsize=settings.user_cache_size,
+            ttl=settings.user_cache_ttl
+        )
     
     async def create_or_update_user(self, user: User) -> User:
         """Create a new user or update existing user (upsert operation)."""
+        self._user_cache.pop(user.phone)
         try:
-            # Convert numpy array to list for JSON serialization
-            embedding_list = user.embedding.tolist()
-            
             user_data = {
                 "phone": user.phone,
-                "embedding": embedding_list,
+                "embedding": _encode_embedding(user.embedding),
+                **_encode_quantized_embedding(user.embedding),
                 "enrolled_at": user.enrolled_at.isoformat()
             }
             
             # Use upsert to handle both create and update cases
-            result = self.client.client.table("users").upsert(
-                user_data,
-                on_conflict="phone"
-            ).execute()
+            result = await self.client.execute(
+                self.client.client.table("users").upsert(user_data, on_conflict="phone")
+            )
             
             if not result.data:
                 raise ValueError("Failed to create/update user")
             
             logger.info(f"Successfully upserted user {user.phone}")
+            self._user_cache.set(user.phone, user)
             return user
             
         except APIError as e:
@@ -82,22 +235,46 @@ class UserRepository:
     
     async def get_user_by_phone(self, phone: str) -> Optional[User]:
         """Retrieve user by phone number (primary identifier)."""
+        user = self._user_cache.get(phone)
+        if user is not None:
+            return user
+        
         try:
-            result = self.client.client.table("users").select("*").eq("phone", phone).execute()
+            if self.client.direct_sql_enabled:
+                pool = await self.client.get_pool()
+                row = await pool.fetchrow(
+                    "SELECT phone, embedding_int8, embedding_scale, enrolled_at FROM users WHERE phone = $1",
+                    phone
+                )
+                if row is None:
+                    return None
+                
+                user = User.from_trusted(
+                    phone=row["phone"],
+                    embedding=_decode_quantized_embedding(row["embedding_int8"], row["embedding_scale"]),
+                    enrolled_at=row["enrolled_at"]
+                )
+                self._user_cache.set(phone, user)
+                return user
+            
+            result = await self.client.execute(
+                self.client.client.table("users").select(_USER_COLUMNS).eq("phone", phone)
+            )
             
             if not result.data:
                 return None
             
             user_data = result.data[0]
             
-            # Convert embedding list back to numpy array
-            embedding = np.array(user_data["embedding"], dtype=np.float64)
-            
-            return User(
+            user = User.from_trusted(
                 phone=user_data["phone"],
-                embedding=embedding,
-                enrolled_at=datetime.fromisoformat(user_data["enrolled_at"].replace('Z', '+00:00'))
+                embedding=_decode_quantized_embedding(
+                    user_data["embedding_int8"], user_data["embedding_scale"]
+                ),
+                enrolled_at=datetime.fromisoformat(user_data["enrolled_at"])
             )
+            self._user_cache.set(phone, user)
+            return user
             
         except APIError as e:
             logger.error(f"Database error retrieving user by phone {phone}: {e}")
@@ -106,10 +283,45 @@ class UserRepository:
             logger.error(f"Unexpected error retrieving user by phone {phone}: {e}")
             raise
     
+    async def get_user_summary_by_phone(self, phone: str) -> Optional[UserSummary]:
+        """
+        Retrieve a user's enrollment record without the embedding.
+        
+        For callers that only need to know whether/when a phone enrolled; skips
+        transferring and decoding the embedding.
+        """
+        user = self._user_cache.get(phone)
+        if user is not None:
+            return UserSummary(phone=user.phone, enrolled_at=user.enrolled_at)
+        
+        try:
+            result = await self.client.execute(
+                self.client.client.table("users").select(_USER_SUMMARY_COLUMNS).eq("phone", phone)
+            )
+            
+            if not result.data:
+                return None
+            
+            user_data = result.data[0]
+            return UserSummary(
+                phone=user_data["phone"],
+                enrolled_at=datetime.fromisoformat(user_data["enrolled_at"])
+            )
+            
+        except APIError as e:
+            logger.error(f"Database error retrieving user summary by phone {phone}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error retrieving user summary by phone {phone}: {e}")
+            raise
+    
     async def delete_user(self, phone: str) -> bool:
         """Delete user by phone number."""
+        self._user_cache.pop(phone)
         try:
-            result = self.client.client.table("users").delete().eq("phone", phone).execute()
+            result = await self.client.execute(
+                self.client.client.table("users").delete().eq("phone", phone)
+            )
             
             success = len(result.data) > 0
             if success:
@@ -140,18 +352,161 @@ class AuthAttemptRepository:
     def __init__(self, supabase_client: SupabaseClient):
         """Initialize repository with Supabase client."""
         self.client = supabase_client
+        
+        # Fire-and-forget attempt logging: rows are queued and written in bulk
+        # by a background task (started on first use)
+        self._attempt_queue: "asyncio.Queue[AuthAttempt]" = asyncio.Queue()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_size = settings.auth_attempt_batch_size
+        self._flush_interval = settings.auth_attempt_flush_interval
+    
+    @staticmethod
+    def _to_row(auth_attempt: AuthAttempt) -> dict:
+        """
+        Build the auth_attempts row for an attempt.
+        
+        created_at is omitted when unset so the column default (NOW()) fills it.
+        """
+        row = {
+            "phone": auth_attempt.phone,
+            "success": auth_attempt.success,
+            "score": auth_attempt.score
+        }
+        if auth_attempt.created_at is not None:
+            row["created_at"] = auth_attempt.created_at.isoformat()
+        return row
+    
+    def enqueue_auth_attempt(self, auth_attempt: AuthAttempt) -> None:
+        """
+        Queue an authentication attempt for a batched background insert.
+        
+        Returns immediately; the attempt's id is not populated.
+        """
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        self._attempt_queue.put_nowait(auth_attempt)
+    
+    async def create_auth_attempts(self, auth_attempts: List[AuthAttempt]) -> None:
+        """Insert several authentication attempts in a single request."""
+        rows = [self._to_row(attempt) for attempt in auth_attempts]
+        
+        # A bulk insert takes its columns from the rows, so a row without
+        # created_at next to rows with one would get NULL rather than the
+        # column default; give such mixed batches a client-side timestamp
+        if any("created_at" in row for row in rows):
+            now = datetime.now(timezone.utc).isoformat()
+            for row in rows:
+                row.setdefault("created_at", now)
+        
+        try:
+            await self.client.execute(
+                self.client.client.table("auth_attempts").insert(rows)
+            )
+            logger.info(f"Successfully created {len(auth_attempts)} auth attempts")
+            
+        except APIError as e:
+            logger.error(f"Database error creating {len(auth_attempts)} auth attempts: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error creating {len(auth_attempts)} auth attempts: {e}")
+            raise
+    
+    async def _flush_loop(self) -> None:
+        """Drain the attempt queue, writing up to batch_size rows per flush interval."""
+        loop = asyncio.get_running_loop()
+        queue = self._attempt_queue
+        
+        # A timed-out get() is kept pending into the next batch rather than
+        # cancelled: on Python 3.11, wait_for(queue.get(), ...) can drop an
+        # item dequeued just as the timeout fires
+        getter: Optional["asyncio.Task[AuthAttempt]"] = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.create_task(queue.get())
+                batch = [await getter]
+                getter = None
+                deadline = loop.time() + self._flush_interval
+                
+                while len(batch) < self._batch_size:
+                    try:
+                        batch.append(queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    getter = asyncio.create_task(queue.get())
+                    done, _ = await asyncio.wait({getter}, timeout=timeout)
+                    if not done:
+                        break
+                    batch.append(getter.result())
+                    getter = None
+                
+                try:
+                    await self._write_batch(batch)
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+        finally:
+            if getter is not None:
+                getter.cancel()
+    
+    async def _write_batch(self, batch: List[AuthAttempt]) -> None:
+        """
+        Insert a batch of attempts, falling back to one insert per row.
+        
+        A single bad row fails the bulk insert, so the rows are retried
+        individually to keep the rest of the audit trail. Retrying stops at
+        the first retryable (network/5xx) failure, since the remaining rows
+        would fail the same way. Never raises; lost rows are counted in the log.
+        """
+        try:
+            await self.create_auth_attempts(batch)
+            return
+        except Exception:
+            if len(batch) == 1:
+                logger.error("Dropped 1 of 1 auth attempts")
+                return
+        
+        dropped = 0
+        for index, attempt in enumerate(batch):
+            try:
+                await self.create_auth_attempts([attempt])
+            except Exception as e:
+                dropped += 1
+                if is_retryable_error(e):
+                    dropped += len(batch) - index - 1
+                    break
+        
+        if dropped:
+            logger.error(f"Dropped {dropped} of {len(batch)} auth attempts")
+    
+    async def close(self, timeout: float = 5.0) -> None:
+        """Flush queued attempts (waiting up to timeout seconds) and stop the writer."""
+        if self._flush_task is None:
+            return
+        
+        try:
+            await asyncio.wait_for(self._attempt_queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._attempt_queue.qsize()} unflushed auth attempts")
+        
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
     
     async def create_auth_attempt(self, auth_attempt: AuthAttempt) -> AuthAttempt:
         """Create a new authentication attempt record."""
         try:
-            attempt_data = {
-                "phone": auth_attempt.phone,
-                "success": auth_attempt.success,
-                "score": auth_attempt.score,
-                "created_at": auth_attempt.created_at.isoformat()
-            }
-            
-            result = self.client.client.table("auth_attempts").insert(attempt_data).execute()
+            result = await self.client.execute(
+                self.client.client.table("auth_attempts").insert(self._to_row(auth_attempt))
+            )
             
             if not result.data:
                 raise ValueError("Failed to create auth attempt")
@@ -173,13 +528,12 @@ class AuthAttemptRepository:
     async def get_auth_attempts_by_phone(self, phone: str, limit: int = 100) -> List[AuthAttempt]:
         """Retrieve authentication attempts for a user by phone number."""
         try:
-            result = (
+            result = await self.client.execute(
                 self.client.client.table("auth_attempts")
                 .select("*")
                 .eq("phone", phone)
                 .order("created_at", desc=True)
                 .limit(limit)
-                .execute()
             )
             
             attempts = []
@@ -189,7 +543,7 @@ class AuthAttemptRepository:
                     phone=attempt_data["phone"],
                     success=attempt_data["success"],
                     score=attempt_data["score"],
-                    created_at=datetime.fromisoformat(attempt_data["created_at"].replace('Z', '+00:00'))
+                    created_at=datetime.fromisoformat(attempt_data["created_at"])
                 ))
             
             return attempts
@@ -205,16 +559,25 @@ class AuthAttemptRepository:
         """Get count of recent failed authentication attempts for a user by phone."""
         try:
             # Calculate timestamp for X minutes ago
-            from datetime import timedelta
-            cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+            cutoff_time = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+            
+            if self.client.direct_sql_enabled:
+                pool = await self.client.get_pool()
+                return await pool.fetchval(
+                    "SELECT count(*) FROM auth_attempts "
+                    "WHERE phone = $1 AND success = false AND created_at >= $2",
+                    phone, cutoff_time
+                )
             
-            result = (
+            # limit(0): PostgREST returns only the count, no rows (select's
+            # head= flag is missing from the postgrest pinned in production)
+            result = await self.client.execute(
                 self.client.client.table("auth_attempts")
-                .select("count", count="exact")
+                .select("id", count="exact")
                 .eq("phone", phone)
                 .eq("success", False)
                 .gte("created_at", cutoff_time.isoformat())
-                .execute()
+                .limit(0)
             )
             
             return result.count or 0
@@ -240,8 +603,29 @@ class DatabaseManager:
         """Check overall database health."""
         return await self.client.health_check()
     
-    async def retry_operation(self, operation, max_retries: int = 3, base_delay: float = 1.0):
-        """Retry database operations with exponential backoff."""
+    async def close(self) -> None:
+        """Flush pending background writes and close connections."""
+        await self.auth_attempts.close()
+        await self.client.close()
+    
+    async def retry_operation(
+        self,
+        operation,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 10.0,
+        retryable: Callable[[Exception], bool] = is_retryable_error
+    ):
+        """
+        Retry database operations with capped, fully jittered exponential backoff.
+        
+        Args:
+            operation: Zero-argument coroutine function to run
+            max_retries: Maximum number of attempts
+            base_delay: Backoff base in seconds
+            max_delay: Upper bound on the backoff before jitter, in seconds
+            retryable: Predicate deciding whether an exception should be retried
+        """
         last_exception = None
         
         for attempt in range(max_retries):
@@ -249,11 +633,32 @@ class DatabaseManager:
                 return await operation()
             except Exception as e:
                 last_exception = e
+                if not retryable(e):
+                    logger.error(f"Database operation failed with non-retryable error: {e}")
+                    raise
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
-                    logger.warning(f"Database operation failed (attempt {attempt + 1}/{max_retries}), retrying in {delay}s: {e}")
+                    # Full jitter keeps failing workers from retrying in lockstep
+                    delay = min(max_delay, base_delay * (2 ** attempt)) * random.random()
+                    logger.warning(f"Database operation failed (attempt {attempt + 1}/{max_retries}), retrying in {delay:.2f}s: {e}")
                     await asyncio.sleep(delay)
                 else:
                     logger.error(f"Database operation failed after {max_retries} attempts: {e}")
         
-        raise last_exception
\ No newline at end of file
+        raise last_exception
+
+
+# Global database manager instance
+_database_manager: Optional[DatabaseManager] = None
+
+
+def get_database_manager() -> DatabaseManager:
+    """
+    Get the global database manager instance.
+    
+    Returns:
+        DatabaseManager: The global database manager instance
+    """
+    global _database_manager
+    if _database_manager is None:
+        _database_manager = DatabaseManager()
+    return _database_manager
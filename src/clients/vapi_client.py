@@ -6,10 +6,12 @@ with silence detection and buffering capabilities.
 """
 
 import asyncio
+import base64
 import logging
 import time
-from typing import Optional, Callable, List
-import json
+from typing import AsyncIterator, Optional, Callable, Union
+
+import orjson
 
 import websockets
 from websockets.exceptions import ConnectionClosed, WebSocketException
@@ -17,8 +19,44 @@ import numpy as np
 
 from src.utils.audio_utils import pcm_to_wav
 
+# Optional: numba compiles the silence-energy kernel to machine code, which
+# matters for small (~20 ms) frames where numpy's per-call overhead dominates
+try:
+    from numba import njit, types as numba_types
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Bound once: decoded for every text-mode audio frame
+_b64decode = base64.b64decode
+
+
+def _mean_square_numpy(samples: np.ndarray) -> float:
+    """Mean of squared int16 samples, accumulated in int64."""
+    return np.einsum('i,i->', samples, samples, dtype=np.int64) / samples.size
+
+
+if _NUMBA_AVAILABLE:
+    # Eagerly compiled for read-only (views over bytes) and writable int16
+    # buffers so no JIT compilation happens during a live capture
+    @njit(
+        [
+            numba_types.float64(numba_types.Array(numba_types.int16, 1, 'C', readonly=True)),
+            numba_types.float64(numba_types.Array(numba_types.int16, 1, 'C')),
+        ],
+        cache=True,
+        boundscheck=False
+    )
+    def _mean_square(samples):
+        total = 0
+        for sample in samples:
+            total += np.int64(sample) * np.int64(sample)
+        return total / samples.size
+else:
+    _mean_square = _mean_square_numpy
+
 
 class VAPIConnectionError(Exception):
     """Raised when VAPI WebSocket connection fails."""
@@ -67,12 +105,19 @@ class VAPIWebSocketClient:
         self.channels = channels
         self.sample_width = sample_width
         self.silence_threshold = silence_threshold
+        # Squared threshold in raw int16 units, so silence checks skip sqrt/normalize
+        self._silence_threshold_sq = (silence_threshold * 32767.0) ** 2
         self.silence_duration = silence_duration
         self.max_audio_duration = max_audio_duration
         self.connection_timeout = connection_timeout
         
-        # Audio buffering
-        self.audio_buffer: List[bytes] = []
+        # Audio buffering: captured PCM is appended in place so the finished
+        # capture is already contiguous
+        self.audio_buffer = bytearray()
+        # Hard ceiling on buffered PCM (max duration plus 10% slack), enforced per
+        # frame so a server flooding frames can't outrun the wall-clock check
+        frame_bytes = sample_width * channels
+        self._max_bytes = int(max_audio_duration * sample_rate * 1.1) * frame_bytes
         self.silence_start_time: Optional[float] = None
         self.capture_start_time: Optional[float] = None
         
@@ -98,7 +143,10 @@ class VAPIWebSocketClient:
                     self.listen_url,
                     ping_interval=20,
                     ping_timeout=10,
-                    close_timeout=10
+                    close_timeout=10,
+                    # PCM audio doesn't compress; skip permessage-deflate negotiation
+                    # and per-frame inflate work
+                    compression=None
                 ),
                 timeout=self.connection_timeout
             )
@@ -141,25 +189,27 @@ class VAPIWebSocketClient:
             True if audio is considered silence, False otherwise
         """
         try:
-            # Convert bytes to numpy array (assuming 16-bit PCM)
-            if len(audio_chunk) < 2:
+            # Whole 16-bit samples in the chunk; a trailing odd byte is ignored
+            sample_count = len(audio_chunk) // 2
+            if sample_count == 0:
                 return True
                 
-            # Convert to numpy array of 16-bit integers
-            audio_data = np.frombuffer(audio_chunk, dtype=np.int16)
-            
-            # Calculate RMS (Root Mean Square) amplitude
-            rms = np.sqrt(np.mean(audio_data.astype(np.float32) ** 2))
+            # Zero-copy int16 view over the chunk (valid while audio_chunk is alive,
+            # which covers this call)
+            audio_data = np.frombuffer(audio_chunk, dtype=np.int16, count=sample_count)
             
-            # Normalize RMS to 0-1 range (16-bit max is 32767)
-            normalized_rms = rms / 32767.0
+            # Mean square amplitude, accumulated in int64 without a float copy
+            mean_sq = _mean_square(audio_data)
             
-            is_silence = normalized_rms < self.silence_threshold
+            is_silence = bool(mean_sq < self._silence_threshold_sq)
             
-            if is_silence:
-                logger.debug(f"Silence detected: RMS={normalized_rms:.4f} < threshold={self.silence_threshold}")
-            else:
-                logger.debug(f"Audio detected: RMS={normalized_rms:.4f} >= threshold={self.silence_threshold}")
+            if logger.isEnabledFor(logging.DEBUG):
+                # Normalize RMS to 0-1 range (16-bit max is 32767) for the log line
+                normalized_rms = np.sqrt(mean_sq) / 32767.0
+                if is_silence:
+                    logger.debug(f"Silence detected: RMS={normalized_rms:.4f} < threshold={self.silence_threshold}")
+                else:
+                    logger.debug(f"Audio detected: RMS={normalized_rms:.4f} >= threshold={self.silence_threshold}")
                 
             return is_silence
             
@@ -174,7 +224,7 @@ class VAPIWebSocketClient:
         Returns:
             True if capture should stop, False otherwise
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         
         # Check maximum duration
         if self.capture_start_time and (current_time - self.capture_start_time) >= self.max_audio_duration:
@@ -188,38 +238,48 @@ class VAPIWebSocketClient:
             
         return False
 
-    async def _process_audio_message(self, message: str) -> bool:
+    async def _process_audio_message(self, message: Union[str, bytes]) -> bool:
         """
         Process incoming WebSocket audio message.
         
+        Binary frames are taken as raw PCM. Text frames are parsed as JSON with
+        base64 encoded PCM under the "audio" key.
+        
         Args:
-            message: WebSocket message (expected to be JSON with audio data)
+            message: WebSocket message (raw PCM bytes or JSON text)
             
         Returns:
             True if capture should continue, False if it should stop
         """
         try:
-            # Parse JSON message
-            data = json.loads(message)
-            
-            # Extract audio data (assuming base64 encoded PCM)
-            if 'audio' not in data:
-                logger.debug("Received message without audio data")
-                return True
+            if isinstance(message, (bytes, bytearray, memoryview)):
+                audio_chunk = bytes(message)
+            else:
+                # Parse JSON message
+                data = orjson.loads(message)
+                
+                # Extract audio data (assuming base64 encoded PCM)
+                if 'audio' not in data:
+                    logger.debug("Received message without audio data")
+                    return True
                 
-            import base64
-            audio_chunk = base64.b64decode(data['audio'])
+                audio_chunk = _b64decode(data['audio'])
             
             if not audio_chunk:
                 logger.debug("Received empty audio chunk")
                 return True
                 
-            # Add to buffer
-            self.audio_buffer.append(audio_chunk)
+            # Add to buffer, stopping once the byte ceiling is reached
+            remaining = self._max_bytes - len(self.audio_buffer)
+            if len(audio_chunk) >= remaining:
+                self.audio_buffer += audio_chunk[:remaining]
+                logger.warning(f"Stopping capture: audio buffer reached {self._max_bytes} bytes")
+                return False
+            self.audio_buffer += audio_chunk
             
             # Detect silence
             is_silence = self._detect_silence(audio_chunk)
-            current_time = time.time()
+            current_time = time.monotonic()
             
             if is_silence:
                 # Start or continue silence timer
@@ -235,31 +295,30 @@ class VAPIWebSocketClient:
             # Check if we should stop capture
             return not self._should_stop_capture()
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.warning(f"Failed to parse WebSocket message as JSON: {e}")
             return True  # Continue capture
         except Exception as e:
             logger.error(f"Error processing audio message: {e}")
             return True  # Continue capture
 
-    async def capture_audio(self, min_duration: float = 3.0) -> bytes:
+    async def stream_audio(self, min_duration: float = 3.0) -> AsyncIterator[bytes]:
         """
-        Capture audio from VAPI WebSocket with silence detection.
+        Stream raw PCM chunks from VAPI WebSocket as they arrive.
         
-        Captures audio until either:
-        - Silence is detected for the configured duration
-        - Maximum audio duration is reached
-        - Minimum duration is satisfied and silence is detected
+        Applies the same stop conditions as capture_audio, so consumers can
+        process audio while the caller is still speaking. Every yielded chunk
+        is also appended to audio_buffer.
         
         Args:
             min_duration: Minimum capture duration in seconds (default: 3.0)
             
-        Returns:
-            Captured audio data as WAV bytes
+        Yields:
+            Raw 16-bit PCM audio chunks
             
         Raises:
             VAPIConnectionError: If not connected or connection fails
-            VAPIAudioError: If audio capture fails
+            VAPIAudioError: If audio capture fails or no audio was received
         """
         if not self.is_connected or not self.websocket:
             raise VAPIConnectionError("Not connected to VAPI WebSocket")
@@ -270,16 +329,29 @@ class VAPIWebSocketClient:
             # Reset capture state
             self.audio_buffer.clear()
             self.silence_start_time = None
-            self.capture_start_time = time.time()
+            self.capture_start_time = time.monotonic()
             self.is_capturing = True
             
+            # Hot-loop lookups bound once per capture (the buffer is mutated in
+            # place, never rebound)
+            process_message = self._process_audio_message
+            audio_buffer = self.audio_buffer
+            clock = time.monotonic
+            capture_start_time = self.capture_start_time
+            
             # Capture loop
             async for message in self.websocket:
-                if not await self._process_audio_message(message):
+                buffered = len(audio_buffer)
+                should_continue = await process_message(message)
+                
+                if len(audio_buffer) > buffered:
+                    yield bytes(memoryview(audio_buffer)[buffered:])
+                
+                if not should_continue:
                     break
                     
                 # Check minimum duration before allowing silence-based stop
-                elapsed = time.time() - self.capture_start_time
+                elapsed = clock() - capture_start_time
                 if elapsed < min_duration and self.silence_start_time:
                     # Reset silence timer if we haven't reached minimum duration
                     self.silence_start_time = None
@@ -287,25 +359,14 @@ class VAPIWebSocketClient:
                     
             self.is_capturing = False
             
-            # Combine audio buffer
             if not self.audio_buffer:
                 raise VAPIAudioError("No audio data captured")
-                
-            combined_pcm = b''.join(self.audio_buffer)
-            total_duration = time.time() - self.capture_start_time
-            
-            logger.info(f"Audio capture completed: {len(combined_pcm)} bytes, {total_duration:.1f}s duration")
             
-            # Convert PCM to WAV format
-            wav_data = pcm_to_wav(
-                combined_pcm,
-                sample_rate=self.sample_rate,
-                channels=self.channels,
-                sample_width=self.sample_width
-            )
-            
-            return wav_data
+            total_duration = time.monotonic() - self.capture_start_time
+            logger.info(f"Audio capture completed: {len(self.audio_buffer)} bytes, {total_duration:.1f}s duration")
             
+        except VAPIAudioError:
+            raise
         except ConnectionClosed as e:
             logger.error(f"WebSocket connection closed during capture: {e}")
             raise VAPIConnectionError(f"Connection closed during capture: {e}")
@@ -318,6 +379,40 @@ class VAPIWebSocketClient:
         finally:
             self.is_capturing = False
 
+    async def capture_audio(self, min_duration: float = 3.0) -> bytes:
+        """
+        Capture audio from VAPI WebSocket with silence detection.
+        
+        Captures audio until either:
+        - Silence is detected for the configured duration
+        - Maximum audio duration is reached
+        - Minimum duration is satisfied and silence is detected
+        
+        Args:
+            min_duration: Minimum capture duration in seconds (default: 3.0)
+            
+        Returns:
+            Captured audio data as WAV bytes
+            
+        Raises:
+            VAPIConnectionError: If not connected or connection fails
+            VAPIAudioError: If audio capture fails
+        """
+        async for _ in self.stream_audio(min_duration=min_duration):
+            pass
+        
+        # Convert PCM to WAV format
+        try:
+            return pcm_to_wav(
+                self.audio_buffer,
+                sample_rate=self.sample_rate,
+                channels=self.channels,
+                sample_width=self.sample_width
+            )
+        except Exception as e:
+            logger.error(f"Failed to convert captured audio to WAV: {e}")
+            raise VAPIAudioError(f"Audio capture failed: {e}")
+
     async def __aenter__(self):
         """Async context manager entry."""
         await self.connect()
@@ -361,4 +456,41 @@ async def capture_audio_from_vapi(
         max_audio_duration=max_duration,
         connection_timeout=connection_timeout
     ) as client:
-        return await client.capture_audio(min_duration=min_duration)
\ No newline at end of file
+        return await client.capture_audio(min_duration=min_duration)
+
+
+async def stream_audio_from_vapi(
+    listen_url: str,
+    min_duration: float = 3.0,
+    silence_threshold: float = 0.01,
+    silence_duration: float = 2.0,
+    max_duration: float = 30.0,
+    connection_timeout: float = 10.0
+) -> AsyncIterator[bytes]:
+    """
+    Convenience generator streaming raw PCM chunks from a VAPI WebSocket.
+    
+    Args:
+        listen_url: VAPI WebSocket URL
+        min_duration: Minimum capture duration in seconds
+        silence_threshold: RMS threshold for silence detection
+        silence_duration: Duration of silence to trigger stop
+        max_duration: Maximum capture duration
+        connection_timeout: WebSocket connection timeout
+        
+    Yields:
+        Raw 16-bit PCM audio chunks (16kHz mono)
+        
+    Raises:
+        VAPIConnectionError: If connection fails
+        VAPIAudioError: If audio capture fails
+    """
+    async with VAPIWebSocketClient(
+        listen_url=listen_url,
+        silence_threshold=silence_threshold,
+        silence_duration=silence_duration,
+        max_audio_duration=max_duration,
+        connection_timeout=connection_timeout
+    ) as client:
+        async for chunk in client.stream_audio(min_duration=min_duration):
+            yield chunk
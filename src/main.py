@@ -1,19 +1,26 @@
 """Main FastAPI application for voice authentication microservice."""
 
+import asyncio
+import atexit
 import logging
-import signal
 import sys
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any
 
+import orjson
 import structlog
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from fastapi.utils import is_body_allowed_for_status_code
 from pydantic import BaseModel
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from src.config import settings
+from src.clients.supabase_client import get_database_manager
 from src.api.audio import router as audio_router
 from src.api.vapi import router as vapi_router
 from src.api.auth import router as auth_router
@@ -27,27 +34,57 @@ from src.middleware import (
 )
 from src.observability import (
     setup_observability,
-    instrument_fastapi_app,
-    TracingContextMiddleware
+    instrument_fastapi_app
 )
+from src.services.embedding_service import get_embedding_service
+from src.utils.log_utils import BufferedLogWriter
+from src.utils.time_utils import utc_now_iso
 
 
-# Configure structured logging
+def _render_json(_, __, event_dict: Dict[str, Any]) -> bytes:
+    """Render a log event as a JSON line using orjson."""
+    return orjson.dumps(event_dict, default=str)
+
+
+def _format_exc_info(logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Render exc_info into a traceback string, only for events that carry one."""
+    if "exc_info" in event_dict:
+        return structlog.processors.format_exc_info(logger, method_name, event_dict)
+    return event_dict
+
+
+# Log lines accumulate in stdout's buffer and are flushed on an interval
+# (see _flush_logs_periodically) instead of with a write() per line
+_log_writer = BufferedLogWriter(sys.stdout.buffer)
+atexit.register(_log_writer.flush_buffer)
+
+
+async def _flush_logs_periodically(interval: float) -> None:
+    """Flush buffered log output every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        _log_writer.flush_buffer()
+
+
+# Configure structured logging. Events are written straight to stdout as
+# bytes; level filtering happens in the bound logger, before any processor
+# runs, instead of going through stdlib logging. Exception formatting only
+# runs for events logged with exc_info.
 structlog.configure(
     processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
+        _format_exc_info,
+        _render_json
     ],
     context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
+    logger_factory=structlog.BytesLoggerFactory(
+        file=_log_writer if settings.log_flush_interval > 0 else sys.stdout.buffer
+    ),
+    wrapper_class=structlog.make_filtering_bound_logger(
+        logging.getLevelName(settings.log_level.upper())
+    ),
     cache_logger_on_first_use=True,
 )
 
@@ -65,6 +102,10 @@ class HealthResponse(BaseModel):
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
+    log_flush_task = None
+    if settings.log_flush_interval > 0:
+        log_flush_task = asyncio.create_task(_flush_logs_periodically(settings.log_flush_interval))
+    
     logger.info("Starting voice authentication microservice", 
                 port=settings.port, 
                 host=settings.host)
@@ -74,12 +115,19 @@ async def lifespan(app: FastAPI):
         service_name="voice-auth-microservice",
         service_version="1.0.0",
         otlp_endpoint=None,  # Configure for production deployment
-        enable_console_export=True
+        enable_console_export=settings.log_level.upper() == "DEBUG"
     )
     
     # Instrument FastAPI app
     instrument_fastapi_app(app)
     
+    # Load and warm up the embedding model so the first request doesn't stall
+    if settings.warmup_model_on_startup:
+        try:
+            await asyncio.to_thread(get_embedding_service().warmup)
+        except Exception as e:
+            logger.warning("Embedding model warm-up failed, will load on first request", error=str(e))
+    
     # Validate configuration
     try:
         # Test that all required environment variables are present
@@ -92,6 +140,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down voice authentication microservice")
+    
+    # Flush queued auth attempt writes
+    await get_database_manager().close()
+    
+    if log_flush_task is not None:
+        log_flush_task.cancel()
+    _log_writer.flush_buffer()
 
 
 # Create FastAPI application
@@ -99,7 +154,8 @@ app = FastAPI(
     title="Voice Authentication Microservice",
     description="Production-ready voice authentication service with speaker enrollment and verification",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add middleware (order matters - last added is executed first)
@@ -107,7 +163,6 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(MetricsMiddleware)
 app.add_middleware(RateLimitMiddleware, max_requests=100, window_seconds=60)
-app.add_middleware(TracingContextMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -125,6 +180,21 @@ app.include_router(vapi_router)
 app.include_router(vapi_webhook_router)
 
 
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    """Serialize HTTPException bodies with orjson (FastAPI's default handler uses stdlib json)."""
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=headers)
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> ORJSONResponse:
+    """Serialize request validation errors with orjson."""
+    return ORJSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors())})
+
+
 
 
 @app.get("/healthz", response_model=HealthResponse)
@@ -132,7 +202,7 @@ async def health_check() -> HealthResponse:
     """Health check endpoint."""
     return HealthResponse(
         status="healthy",
-        timestamp=datetime.utcnow()
+        timestamp=datetime.now(timezone.utc)
     )
 
 
@@ -140,22 +210,11 @@ async def health_check() -> HealthResponse:
 async def metrics_endpoint():
     """Application metrics endpoint."""
     return {
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": utc_now_iso(),
         "metrics": get_metrics()
     }
 
 
-def handle_shutdown(signum, frame):
-    """Handle graceful shutdown signals."""
-    logger.info("Received shutdown signal", signal=signum)
-    sys.exit(0)
-
-
-# Register signal handlers for graceful shutdown
-signal.signal(signal.SIGTERM, handle_shutdown)
-signal.signal(signal.SIGINT, handle_shutdown)
-
-
 if __name__ == "__main__":
     import uvicorn
     
@@ -163,6 +222,9 @@ if __name__ == "__main__":
         "src.main:app",
         host=settings.host,
         port=settings.port,
+        workers=settings.web_concurrency or 1,
         log_level=settings.log_level.lower(),
+        loop="uvloop",
+        http="httptools",
         reload=False
     )
\ No newline at end of file
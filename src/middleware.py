@@ -1,222 +1,323 @@
 """
 Custom middleware for the voice authentication microservice.
+
+All middleware here is plain ASGI (like TracingContextMiddleware) rather
+than BaseHTTPMiddleware, so requests do not pay for a per-request task
+group and memory stream, and streamed responses keep backpressure.
 """
 
 import time
-from typing import Callable, Dict, Any
-from datetime import datetime
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Any
 
 import structlog
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+
+from src.utils.cache import TTLCache
+from src.utils.time_utils import utc_now_iso
 
 logger = structlog.get_logger()
 
+# ASGI scope key holding the request's perf_counter_ns() start time
+REQUEST_START_KEY = "voice_auth.request_start_ns"
+
+
+def request_start_ns(scope) -> int:
+    """
+    Get the request's start time, shared by every middleware in the stack.
+    
+    The outermost middleware to ask records the clock reading in the scope;
+    the rest reuse it instead of reading the clock again.
+    
+    Args:
+        scope: ASGI connection scope
+        
+    Returns:
+        int: time.perf_counter_ns() at the start of the request
+    """
+    start_ns = scope.get(REQUEST_START_KEY)
+    if start_ns is None:
+        start_ns = scope[REQUEST_START_KEY] = time.perf_counter_ns()
+    return start_ns
+
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware:
     """
     Middleware for request/response logging with correlation ID support.
     """
     
     def __init__(self, app, exclude_paths: set = None):
-        super().__init__(app)
+        self.app = app
         self.exclude_paths = exclude_paths or {"/healthz", "/docs", "/redoc", "/openapi.json"}
+        # Prefixes, so sub-paths such as /docs/oauth2-redirect are skipped too;
+        # str.startswith with a tuple checks them all in one call
+        self._exclude_prefixes = tuple(self.exclude_paths)
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Skip logging for health checks and docs
-        if request.url.path in self.exclude_paths:
-            return await call_next(request)
+    async def __call__(self, scope, receive, send):
+        # Skip logging for non-HTTP traffic, health checks and docs
+        if scope["type"] != "http" or scope["path"].startswith(self._exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
         
-        # Extract correlation ID
-        correlation_id = request.headers.get("X-Call-ID", f"req_{int(time.time() * 1000)}")
+        headers = Headers(scope=scope)
+        start_ns = request_start_ns(scope)
         
-        # Add correlation ID to structured logging context
-        structlog.contextvars.clear_contextvars()
-        structlog.contextvars.bind_contextvars(correlation_id=correlation_id)
+        # Extract correlation ID; without one, generate a random ID (the
+        # monotonic start time has no meaning outside this process and can
+        # repeat across workers)
+        correlation_id = headers.get("X-Call-ID")
+        if correlation_id is None:
+            correlation_id = f"req_{uuid.uuid4().hex}"
+        encoded_correlation_id = correlation_id.encode("latin-1")
+        response_started = False
         
-        # Log request
-        start_time = time.time()
-        logger.info(
-            "Request started",
-            method=request.method,
-            path=request.url.path,
-            query_params=dict(request.query_params),
-            user_agent=request.headers.get("User-Agent", "unknown"),
-            correlation_id=correlation_id
-        )
-        
-        try:
-            # Process request
-            response = await call_next(request)
+        # Bind the correlation ID for this request only; the binding is reset on
+        # exit, including when the request raises
+        with structlog.contextvars.bound_contextvars(correlation_id=correlation_id):
+            # Log request; method and path are bound once for every event of
+            # this request, and the raw query string is logged as-is (only
+            # when present) rather than parsed into a dict
+            request_logger = logger.bind(method=scope["method"], path=scope["path"])
+            query_string = scope.get("query_string")
+            if query_string:
+                request_logger.info("Request started", query_string=query_string.decode("latin-1"))
+            else:
+                request_logger.info("Request started")
             
-            # Calculate processing time
-            process_time = time.time() - start_time
+            async def send_with_correlation_id(message):
+                nonlocal response_started
+                if message["type"] == "http.response.start":
+                    response_started = True
+                    
+                    # Log response; the user agent is only worth recording
+                    # for failed requests
+                    status_code = message["status"]
+                    process_time_ms = round((time.perf_counter_ns() - start_ns) / 1_000_000, 2)
+                    if status_code >= 400:
+                        request_logger.info(
+                            "Request completed",
+                            status_code=status_code,
+                            process_time_ms=process_time_ms,
+                            user_agent=headers.get("User-Agent", "unknown")
+                        )
+                    else:
+                        request_logger.info(
+                            "Request completed",
+                            status_code=status_code,
+                            process_time_ms=process_time_ms
+                        )
+                    
+                    # Add correlation ID to response headers
+                    response_headers = [item for item in message.get("headers", ()) if item[0] != b"x-call-id"]
+                    response_headers.append((b"x-call-id", encoded_correlation_id))
+                    message["headers"] = response_headers
+                await send(message)
             
-            # Log response
-            logger.info(
-                "Request completed",
-                status_code=response.status_code,
-                process_time_ms=round(process_time * 1000, 2),
-                correlation_id=correlation_id
-            )
+            try:
+                # Process request
+                await self.app(scope, receive, send_with_correlation_id)
             
-            # Add correlation ID to response headers
-            response.headers["X-Call-ID"] = correlation_id
+            except Exception as e:
+                # Calculate processing time
+                process_time_ms = round((time.perf_counter_ns() - start_ns) / 1_000_000, 2)
             
-            return response
+                # Log error
+                request_logger.error(
+                    "Request failed",
+                    error=str(e),
+                    error_type=type(e).__name__,
+                    process_time_ms=process_time_ms,
+                    exc_info=True
+                )
+                
+                # Headers are already on the wire; nothing left to replace
+                if response_started:
+                    raise
             
-        except Exception as e:
-            # Calculate processing time
-            process_time = time.time() - start_time
-            
-            # Log error
-            logger.error(
-                "Request failed",
-                error=str(e),
-                error_type=type(e).__name__,
-                process_time_ms=round(process_time * 1000, 2),
-                correlation_id=correlation_id
-            )
-            
-            # Return standardized error response
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": "InternalServerError",
-                    "message": "An unexpected error occurred",
-                    "correlation_id": correlation_id,
-                    "timestamp": datetime.utcnow().isoformat()
-                },
-                headers={"X-Call-ID": correlation_id}
-            )
+                # Return standardized error response
+                response = ORJSONResponse(
+                    status_code=500,
+                    content={
+                        "error": "InternalServerError",
+                        "message": "An unexpected error occurred",
+                        "correlation_id": correlation_id,
+                        "timestamp": utc_now_iso()
+                    },
+                    headers={"X-Call-ID": correlation_id}
+                )
+                await response(scope, receive, send)
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to responses.
     """
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
+    SECURITY_HEADERS = (
+        ("X-Content-Type-Options", "nosniff"),
+        ("X-Frame-Options", "DENY"),
+        ("X-XSS-Protection", "1; mode=block"),
+        ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+        ("Content-Security-Policy", "default-src 'self'"),
+        ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    )
+    
+    # Encoded once; appended straight to the raw header list so the headers are
+    # not re-normalized and re-encoded through MutableHeaders per response
+    _ENCODED_HEADERS = tuple(
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in SECURITY_HEADERS
+    )
+    _ENCODED_NAMES = frozenset(name for name, _ in _ENCODED_HEADERS)
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Add security headers
-        response.headers.update({
-            "X-Content-Type-Options": "nosniff",
-            "X-Frame-Options": "DENY",
-            "X-XSS-Protection": "1; mode=block",
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-            "Content-Security-Policy": "default-src 'self'",
-            "Referrer-Policy": "strict-origin-when-cross-origin"
-        })
+        async def send_with_security_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                if any(name in self._ENCODED_NAMES for name, _ in headers):
+                    # A route set one of these itself; keep the override semantics
+                    headers = [item for item in headers if item[0] not in self._ENCODED_NAMES]
+                headers.extend(self._ENCODED_HEADERS)
+                message["headers"] = headers
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_security_headers)
+
+
+@dataclass(slots=True)
+class RequestMetrics:
+    """Process-wide request counters updated by MetricsMiddleware."""
+    request_count: int = 0
+    error_count: int = 0
+    total_processing_time: float = 0.0
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
+# Shared by the MetricsMiddleware instance Starlette builds and get_metrics()
+_request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
     """
     Middleware to collect basic metrics about requests.
     """
     
     def __init__(self, app):
-        super().__init__(app)
-        self.request_count = 0
-        self.error_count = 0
-        self.total_processing_time = 0.0
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        # Counters are only touched from the event loop thread, so plain int
+        # and float updates are already atomic; they are updated in one place
+        start_ns = request_start_ns(scope)
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_with_status)
             
-            # Update metrics
-            self.request_count += 1
-            processing_time = time.time() - start_time
-            self.total_processing_time += processing_time
+        except Exception:
+            status_code = 500
+            raise
             
-            if response.status_code >= 400:
-                self.error_count += 1
-            
-            return response
-            
-        except Exception as e:
-            # Update error metrics
-            self.request_count += 1
-            self.error_count += 1
-            processing_time = time.time() - start_time
-            self.total_processing_time += processing_time
-            
-            raise e
-    
-    def get_metrics(self) -> Dict[str, Any]:
-        """Get current metrics."""
-        avg_processing_time = (
-            self.total_processing_time / self.request_count 
-            if self.request_count > 0 else 0
-        )
-        
-        return {
-            "total_requests": self.request_count,
-            "error_count": self.error_count,
-            "error_rate": self.error_count / self.request_count if self.request_count > 0 else 0,
-            "avg_processing_time_ms": round(avg_processing_time * 1000, 2)
-        }
-
-
-# Global metrics instance
-metrics_middleware = MetricsMiddleware(None)
+        finally:
+            metrics = _request_metrics
+            metrics.request_count += 1
+            metrics.total_processing_time += (time.perf_counter_ns() - start_ns) / 1_000_000_000
+            if status_code >= 400:
+                metrics.error_count += 1
 
 
 def get_metrics() -> Dict[str, Any]:
     """Get current application metrics."""
-    return metrics_middleware.get_metrics()
+    metrics = _request_metrics
+    request_count = metrics.request_count
+    avg_processing_time = (
+        metrics.total_processing_time / request_count
+        if request_count > 0 else 0
+    )
+    
+    return {
+        "total_requests": request_count,
+        "error_count": metrics.error_count,
+        "error_rate": metrics.error_count / request_count if request_count > 0 else 0,
+        "avg_processing_time_ms": round(avg_processing_time * 1000, 2)
+    }
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Simple rate limiting middleware (in-memory, for basic protection).
     """
     
-    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
-        super().__init__(app)
+    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60,
+                 max_clients: int = 100_000):
+        self.app = app
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, list] = {}
+        self._window_ns = window_seconds * 1_000_000_000
+        # Per-IP request start times (perf_counter_ns); an IP idle for a full
+        # window has nothing left to count, so its entry expires with the
+        # window and the table stays bounded
+        self.requests: TTLCache[Deque[int]] = TTLCache(maxsize=max_clients, ttl=window_seconds)
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        client_ip = request.client.host if request.client else "unknown"
-        current_time = time.time()
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        current_time = request_start_ns(scope)
         
-        # Clean old requests
-        if client_ip in self.requests:
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if current_time - req_time < self.window_seconds
-            ]
-        else:
-            self.requests[client_ip] = []
+        # Drop requests that have left the window; timestamps are appended in
+        # order, so expired entries are always at the left end
+        timestamps = self.requests.get(client_ip)
+        if timestamps is None:
+            timestamps = deque(maxlen=self.max_requests)
+        self.requests.set(client_ip, timestamps)
+        while timestamps and current_time - timestamps[0] >= self._window_ns:
+            timestamps.popleft()
         
         # Check rate limit
-        if len(self.requests[client_ip]) >= self.max_requests:
+        if len(timestamps) >= self.max_requests:
             logger.warning(
                 "Rate limit exceeded",
                 client_ip=client_ip,
-                request_count=len(self.requests[client_ip]),
+                request_count=len(timestamps),
                 max_requests=self.max_requests
             )
             
-            return JSONResponse(
+            response = ORJSONResponse(
                 status_code=429,
                 content={
                     "error": "RateLimitExceeded",
                     "message": f"Too many requests. Limit: {self.max_requests} per {self.window_seconds} seconds",
-                    "correlation_id": request.headers.get("X-Call-ID", "unknown"),
-                    "timestamp": datetime.utcnow().isoformat()
+                    "correlation_id": Headers(scope=scope).get("X-Call-ID", "unknown"),
+                    "timestamp": utc_now_iso()
                 }
             )
+            await response(scope, receive, send)
+            return
         
         # Add current request
-        self.requests[client_ip].append(current_time)
+        timestamps.append(current_time)
         
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
\ No newline at end of file
@@ -10,6 +10,7 @@ from .api_models import (
 )
 from .internal_models import (
     User,
+    UserSummary,
     AuthAttempt
 )
 
@@ -21,5 +22,6 @@ __all__ = [
     "HealthResponse",
     "ErrorResponse",
     "User",
+    "UserSummary",
     "AuthAttempt"
 ]
\ No newline at end of file
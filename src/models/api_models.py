@@ -6,6 +6,29 @@ from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, field_validator
 
 
+# Deletes the accepted formatting characters in one str.translate call
+_PHONE_FORMATTING_TABLE = str.maketrans('', '', '+()-. ')
+
+
+def _validate_phone_number(v: str) -> str:
+    """
+    Validate a phone number with C-level string operations.
+    
+    Accepts digits plus common formatting characters and requires 10-15
+    digits (the E.164 maximum). The value is returned unchanged because it
+    is the stored user key.
+    """
+    digits = v.translate(_PHONE_FORMATTING_TABLE)
+    if digits and not digits.isdigit():
+        invalid = next(c for c in digits if not c.isdigit())
+        raise ValueError(f'Phone number contains invalid character: {invalid!r}')
+    if len(digits) < 10:
+        raise ValueError('Phone number must contain at least 10 digits')
+    if len(digits) > 15:
+        raise ValueError('Phone number must contain at most 15 digits')
+    return v
+
+
 class EnrollmentRequest(BaseModel):
     """Request model for user enrollment endpoint."""
     
@@ -16,11 +39,7 @@ class EnrollmentRequest(BaseModel):
     @classmethod
     def validate_phone(cls, v):
         """Validate phone number format."""
-        # Remove common phone number characters
-        cleaned = ''.join(c for c in v if c.isdigit() or c in '+()-. ')
-        if len(cleaned.replace(' ', '').replace('-', '').replace('(', '').replace(')', '').replace('+', '').replace('.', '')) < 10:
-            raise ValueError('Phone number must contain at least 10 digits')
-        return v
+        return _validate_phone_number(v)
     
     @field_validator('audioUrl')
     @classmethod
@@ -52,6 +71,12 @@ class VerificationRequest(BaseModel):
     phone: str = Field(..., min_length=10, max_length=20, description="User's phone number (unique identifier)")
     listenUrl: str = Field(..., description="WebSocket URL for live audio capture")
     
+    @field_validator('phone')
+    @classmethod
+    def validate_phone(cls, v):
+        """Validate phone number format."""
+        return _validate_phone_number(v)
+    
     @field_validator('listenUrl')
     @classmethod
     def validate_listen_url(cls, v):
@@ -7,28 +7,62 @@ from typing import Optional
 import numpy as np
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class User:
     """Internal user model for voice authentication."""
     
     phone: str  # Primary key - unique phone number
-    embedding: np.ndarray  # 192-dimensional speaker embedding
+    embedding: np.ndarray  # 192-dimensional float32 speaker embedding
     enrolled_at: datetime
     
     def __post_init__(self):
-        """Validate embedding dimensions after initialization."""
-        if self.embedding.shape != (192,):
-            raise ValueError(f"Embedding must be 192-dimensional, got {self.embedding.shape}")
+        """Coerce the embedding to float32 and validate its dimensions."""
+        embedding = np.asarray(self.embedding, dtype=np.float32)
+        if embedding.shape != (192,):
+            raise ValueError(f"Embedding must be 192-dimensional, got {embedding.shape}")
+        object.__setattr__(self, "embedding", embedding)
+    
+    @classmethod
+    def from_trusted(cls, phone: str, embedding: np.ndarray, enrolled_at: datetime) -> "User":
+        """
+        Build a User without coercion or validation.
+        
+        For rows read back from the users table: the embedding_int8 column is
+        constrained to 192 bytes and _decode_quantized_embedding checks the
+        length, so the shape is already guaranteed; the embedding must
+        already be float32.
+        
+        Args:
+            phone: User's phone number
+            embedding: 192-dimensional float32 speaker embedding
+            enrolled_at: Enrollment timestamp
+            
+        Returns:
+            User: The user record
+        """
+        user = object.__new__(cls)
+        object.__setattr__(user, "phone", phone)
+        object.__setattr__(user, "embedding", embedding)
+        object.__setattr__(user, "enrolled_at", enrolled_at)
+        return user
+
+
+@dataclass(slots=True)
+class UserSummary:
+    """Enrollment record without the embedding, for non-biometric lookups."""
+    
+    phone: str
+    enrolled_at: datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class AuthAttempt:
     """Internal model for authentication attempt logging."""
     
     phone: str  # Phone number of the user attempting authentication
     success: bool
     score: Optional[float]
-    created_at: datetime
+    created_at: Optional[datetime] = None  # None lets the database default (NOW()) fill it
     id: Optional[int] = None  # Database-generated ID
     
     def __post_init__(self):
@@ -1,21 +1,27 @@
 """
 Observability and monitoring setup for the voice authentication microservice.
+
+Cardinality contract: metric attributes must stay low-cardinality (operation,
+success, method, route, status). Per-user identifiers such as the phone
+number are only attached to log events and spans, never to metric
+attribute sets.
 """
 
 import time
 from typing import Optional, Dict, Any, Callable
-from functools import wraps
 
 import structlog
 
-logger = structlog.get_logger()
+# Initial values on the lazy proxy are bound once, when it is first used
+# (after structlog is configured), not formatted on every call
+logger = structlog.get_logger(component="observability")
 
 
 def setup_observability(
     service_name: str = "voice-auth-microservice",
     service_version: str = "1.0.0",
     otlp_endpoint: Optional[str] = None,
-    enable_console_export: bool = True
+    enable_console_export: bool = False
 ) -> None:
     """
     Set up observability (currently only structlog is used).
@@ -24,8 +30,12 @@ def setup_observability(
         service_name: Name of the service for tracing
         service_version: Version of the service
         otlp_endpoint: OTLP endpoint for trace/metric export
-        enable_console_export: Whether to enable console export for development
+        enable_console_export: Whether to enable console export (debug only; off by default)
     """
+    # Nothing to set up until an exporter is wired in
+    if otlp_endpoint is None:
+        return
+    
     logger.info(
         "Setting up observability",
         service_name=service_name,
@@ -43,49 +53,36 @@ def instrument_fastapi_app(app) -> None:
     Args:
         app: FastAPI application instance
     """
-    logger.info("FastAPI application instrumented with OpenTelemetry")
 
 
 def trace_function(operation_name: Optional[str] = None):
     """
-    Decorator to trace function execution (currently no-op).
+    Decorator to trace function execution (currently no-op, returns the function unchanged).
     
     Args:
         operation_name: Optional custom operation name for the span
     """
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            return await func(*args, **kwargs)
-        
-        @wraps(func)
-        def sync_wrapper(*args, **kwargs):
-            return func(*args, **kwargs)
-        
-        # Return appropriate wrapper based on function type
-        import asyncio
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+        # Return the function itself so traced call sites pay for no extra frame
+        return func
     
     return decorator
 
 
-def record_enrollment_metrics(success: bool, processing_time: float, user_id: str) -> None:
+def record_enrollment_metrics(success: bool, processing_time: float, phone: str) -> None:
     """
-    Record metrics for enrollment operations (currently only logging).
+    Record metrics for enrollment operations (currently only debug logging).
     
     Args:
         success: Whether enrollment was successful
         processing_time: Time taken for enrollment in seconds
-        user_id: User ID for attribution
+        phone: User's phone number for attribution
     """
-    logger.info(
+    logger.debug(
         "Enrollment operation",
         success=success,
         processing_time=processing_time,
-        user_id=user_id
+        phone=phone
     )
 
 
@@ -93,45 +90,47 @@ def record_verification_metrics(
     success: bool,
     processing_time: float,
     similarity_score: Optional[float],
-    user_id: str
+    phone: str
 ) -> None:
     """
-    Record metrics for verification operations (currently only logging).
+    Record metrics for verification operations (currently only debug logging).
     
     Args:
         success: Whether verification was successful
         processing_time: Time taken for verification in seconds
         similarity_score: Voice similarity score (if available)
-        user_id: User ID for attribution
+        phone: User's phone number for attribution
     """
-    logger.info(
+    logger.debug(
         "Verification operation",
         success=success,
         processing_time=processing_time,
         similarity_score=similarity_score,
-        user_id=user_id
+        phone=phone
     )
 
 
 def record_http_metrics(
     method: str,
-    path: str,
+    route: str,
     status_code: int,
     processing_time: float
 ) -> None:
     """
-    Record HTTP request metrics (currently only logging).
+    Record HTTP request metrics (currently only debug logging).
     
     Args:
         method: HTTP method
-        path: Request path
+        route: Route template (e.g. scope["route"].path, such as
+            "/users/{phone}"), never the raw request path, so the number of
+            series stays bounded by the number of routes
         status_code: HTTP status code
         processing_time: Request processing time in seconds
     """
-    logger.info(
+    logger.debug(
         "HTTP request",
         method=method,
-        path=path,
+        route=route,
         status_code=status_code,
         processing_time=processing_time
     )
@@ -7,25 +7,41 @@ This module provides the core business logic for:
 - Integration with database storage and external services
 """
 
+import asyncio
+import hashlib
 import logging
-import tempfile
-from datetime import datetime
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
 
-from src.clients.supabase_client import DatabaseManager
-from src.clients.vapi_client import capture_audio_from_vapi, VAPIConnectionError, VAPIAudioError
+import numpy as np
+
+from src.clients.supabase_client import DatabaseManager, get_database_manager
+from src.clients.vapi_client import stream_audio_from_vapi, VAPIConnectionError, VAPIAudioError
 from src.models.internal_models import User, AuthAttempt
-from src.services.embedding_service import get_embedding_service
+from src.services.embedding_service import EmbeddingBatcher, get_embedding_service
 from src.utils.audio_utils import (
     process_audio_for_enrollment,
     AudioDownloadError,
     AudioProcessingError,
     get_audio_duration
 )
+from src.utils.cache import TTLCache
 from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# VAPI listen streams deliver 16kHz mono 16-bit PCM
+LIVE_AUDIO_SAMPLE_RATE = 16000
+
+# Model forward passes are CPU-bound and block for hundreds of milliseconds;
+# they run here instead of on the event loop (torch releases the GIL)
+_embedding_executor = ThreadPoolExecutor(
+    max_workers=settings.embedding_workers,
+    thread_name_prefix="embedding"
+)
+
 
 class AuthenticationError(Exception):
     """Base exception for authentication service errors."""
@@ -42,6 +58,31 @@ class VerificationError(AuthenticationError):
     pass
 
 
+class EnrollmentDownloadError(EnrollmentError):
+    """Raised when enrollment audio cannot be downloaded."""
+    pass
+
+
+class EnrollmentAudioProcessingError(EnrollmentError):
+    """Raised when enrollment audio cannot be converted."""
+    pass
+
+
+class EnrollmentStorageError(EnrollmentError):
+    """Raised when the enrolled user cannot be stored in the database."""
+    pass
+
+
+class VerificationConnectionError(VerificationError):
+    """Raised when the live audio stream cannot be reached."""
+    pass
+
+
+class VerificationAudioError(VerificationError):
+    """Raised when live audio cannot be captured or processed."""
+    pass
+
+
 class AuthenticationService:
     """
     Core authentication service handling enrollment and verification workflows.
@@ -57,13 +98,52 @@ class AuthenticationService:
         Args:
             db_manager: Database manager instance. If None, creates a new one.
         """
-        self.db = db_manager or DatabaseManager()
+        self.db = db_manager or get_database_manager()
         self.embedding_service = get_embedding_service()
         self.voice_threshold = getattr(settings, 'voice_threshold', 0.82)
         
+        # Embeddings keyed by processed audio content hash, so repeated
+        # enrollments with the same recording skip embedding generation
+        self._enrollment_cache: TTLCache[np.ndarray] = TTLCache(
+            maxsize=settings.enrollment_cache_size,
+            ttl=settings.enrollment_cache_ttl
+        )
+        
+        # Embeddings keyed by audio URL hash, so retries and webhook
+        # redeliveries skip the download too. A hit trusts that the URL still
+        # serves the same recording, which does not hold for reused upload
+        # paths or re-signed URLs whose object was replaced; the short TTL
+        # bounds how long a replaced recording can be missed.
+        self._enrollment_url_cache: TTLCache[np.ndarray] = TTLCache(
+            maxsize=settings.enrollment_cache_size,
+            ttl=settings.enrollment_url_cache_ttl
+        )
+        
+        # Enrolled embeddings keyed by phone, so verification skips the DB fetch.
+        # Held L2-normalized as float16 (384 B per user) and upcast to float32 on read.
+        self._user_embedding_cache: TTLCache[np.ndarray] = TTLCache(
+            maxsize=settings.user_embedding_cache_size,
+            ttl=settings.user_embedding_cache_ttl
+        )
+        
+        # In-flight lookups by phone, so concurrent cache misses for the same
+        # user (e.g. retries during a VAPI reconnect storm) share one DB fetch
+        self._user_embedding_fetches: Dict[str, "asyncio.Task[Optional[np.ndarray]]"] = {}
+        
+        # Optional micro-batching of final verification embeddings
+        self._embedding_batcher: Optional[EmbeddingBatcher] = None
+        if settings.embedding_batch_enabled:
+            self._embedding_batcher = EmbeddingBatcher(
+                self.embedding_service,
+                _embedding_executor,
+                max_batch_size=settings.embedding_batch_max_size,
+                max_wait=settings.embedding_batch_max_wait,
+                sample_rate=LIVE_AUDIO_SAMPLE_RATE
+            )
+        
         logger.info(f"Authentication service initialized with voice threshold: {self.voice_threshold}")
     
-    async def enroll_user(self, phone: str, audio_url: str) -> Tuple[str, float]:
+    async def enroll_user(self, phone: str, audio_url: str) -> Tuple[str, float, bool]:
         """
         Enroll a user for voice authentication.
         
@@ -73,12 +153,16 @@ class AuthenticationService:
         3. Store user record in database
         4. Return enrollment status
         
+        Steps 1-2 are skipped when an embedding for the same audio URL or
+        audio content is cached.
+        
         Args:
             phone: User's phone number (unique identifier)
             audio_url: URL to download enrollment audio
             
         Returns:
-            Tuple of (status_message, confidence_score)
+            Tuple of (status_message, confidence_score, cache_hit), where
+            cache_hit is True if the audio URL's cached embedding was used
             
         Raises:
             EnrollmentError: If any step of enrollment fails
@@ -86,69 +170,40 @@ class AuthenticationService:
         try:
             logger.info(f"Starting enrollment for user phone: {phone}")
             
-            # Step 1: Download and process audio
-            try:
-                processed_audio = await process_audio_for_enrollment(audio_url)
-                logger.info(f"Audio processing completed: {len(processed_audio)} bytes")
-                
-                # Validate audio duration (should be at least 3 seconds for good enrollment)
-                duration = get_audio_duration(processed_audio)
-                if duration < 3.0:
-                    raise EnrollmentError(f"Audio too short for enrollment: {duration:.1f}s (minimum 3s required)")
-                    
-                logger.info(f"Audio duration: {duration:.1f}s")
-                
-            except AudioDownloadError as e:
-                logger.error(f"Audio download failed for user {phone}: {e}")
-                raise EnrollmentError(f"Failed to download audio: {e}")
-            except AudioProcessingError as e:
-                logger.error(f"Audio processing failed for user {phone}: {e}")
-                raise EnrollmentError(f"Failed to process audio: {e}")
-            
-            # Step 2: Generate voice embedding
-            try:
-                # Save processed audio to temporary file for embedding generation
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                    temp_file.write(processed_audio)
-                    temp_audio_path = temp_file.name
-                
-                # Generate embedding
-                embedding = self.embedding_service.generate_embedding(temp_audio_path)
-                logger.info(f"Generated embedding for user {phone}: shape {embedding.shape}")
-                
-                # Validate embedding
-                if not self.embedding_service.validate_embedding(embedding):
-                    raise EnrollmentError("Generated embedding failed validation")
-                
-            except Exception as e:
-                logger.error(f"Embedding generation failed for user {phone}: {e}")
-                raise EnrollmentError(f"Failed to generate voice embedding: {e}")
-            finally:
-                # Cleanup temporary file
-                try:
-                    import os
-                    if 'temp_audio_path' in locals():
-                        os.unlink(temp_audio_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to cleanup temporary file: {cleanup_error}")
+            url_key = self._enrollment_url_key(audio_url)
+            embedding = self._enrollment_url_cache.get(url_key)
+            cache_hit = embedding is not None
+            if cache_hit:
+                logger.info(f"Enrollment cache hit for user {phone}, skipping audio processing")
+            else:
+                embedding = await self._generate_enrollment_embedding(phone, audio_url)
+                self._enrollment_url_cache.set(url_key, embedding)
             
             # Step 3: Store user record in database
             try:
                 user = User(
                     phone=phone,
                     embedding=embedding,
-                    enrolled_at=datetime.utcnow()
+                    enrolled_at=datetime.now(timezone.utc)
                 )
                 
                 await self.db.users.create_or_update_user(user)
+                
+                # A lookup that started before the upsert may still be running;
+                # detach it so its (old) result is not cached over this one
+                self._user_embedding_fetches.pop(phone, None)
+                self._user_embedding_cache.set(
+                    phone, self.embedding_service.normalize_embedding(embedding).astype(np.float16)
+                )
                 logger.info(f"Successfully enrolled user {phone} in database")
                 
             except Exception as e:
                 logger.error(f"Database operation failed for user {phone}: {e}")
-                raise EnrollmentError(f"Failed to store user enrollment: {e}")
+                self._user_embedding_cache.pop(phone)
+                raise EnrollmentStorageError(f"Failed to store user enrollment: {e}")
             
             logger.info(f"Enrollment completed successfully for user {phone}")
-            return "enrolled", 1.0
+            return "enrolled", 1.0, cache_hit
             
         except EnrollmentError:
             # Re-raise enrollment errors as-is
@@ -157,14 +212,79 @@ class AuthenticationService:
             logger.error(f"Unexpected error during enrollment for user {phone}: {e}")
             raise EnrollmentError(f"Enrollment failed: {e}")
     
+    @staticmethod
+    def _enrollment_url_key(audio_url: str) -> str:
+        """Build the enrollment cache key for an audio URL."""
+        return f"enroll:url:{hashlib.sha256(audio_url.encode()).hexdigest()}"
+    
+    async def _generate_enrollment_embedding(self, phone: str, audio_url: str) -> np.ndarray:
+        """
+        Download, process and embed enrollment audio.
+        
+        Identical audio content reuses a cached embedding even when served
+        from a different URL.
+        
+        Args:
+            phone: User's phone number (for logging)
+            audio_url: URL to download enrollment audio
+            
+        Returns:
+            Validated 192-dimensional speaker embedding
+            
+        Raises:
+            EnrollmentError: If audio processing or embedding generation fails
+        """
+        # Step 1: Download and process audio
+        try:
+            processed_audio = await process_audio_for_enrollment(audio_url)
+            logger.info(f"Audio processing completed: {len(processed_audio)} bytes")
+            
+            # Validate audio duration (should be at least 3 seconds for good enrollment)
+            duration = get_audio_duration(processed_audio)
+            if duration < 3.0:
+                raise EnrollmentError(f"Audio too short for enrollment: {duration:.1f}s (minimum 3s required)")
+                
+            logger.info(f"Audio duration: {duration:.1f}s")
+            
+        except AudioDownloadError as e:
+            logger.error(f"Audio download failed for user {phone}: {e}")
+            raise EnrollmentDownloadError(f"Failed to download audio: {e}")
+        except AudioProcessingError as e:
+            logger.error(f"Audio processing failed for user {phone}: {e}")
+            raise EnrollmentAudioProcessingError(f"Failed to process audio: {e}")
+        
+        content_key = f"enroll:audio:{hashlib.sha256(processed_audio).hexdigest()}"
+        embedding = self._enrollment_cache.get(content_key)
+        if embedding is not None:
+            logger.info(f"Enrollment cache hit on audio content for user {phone}, skipping embedding generation")
+            return embedding
+        
+        # Step 2: Generate voice embedding straight from the processed WAV bytes
+        try:
+            embedding = await self._run_embedding(
+                self.embedding_service.generate_embedding_from_bytes, processed_audio
+            )
+            logger.info(f"Generated embedding for user {phone}: shape {embedding.shape}")
+            
+            # Validate embedding
+            if not self.embedding_service.validate_embedding(embedding):
+                raise EnrollmentError("Generated embedding failed validation")
+            
+        except Exception as e:
+            logger.error(f"Embedding generation failed for user {phone}: {e}")
+            raise EnrollmentError(f"Failed to generate voice embedding: {e}")
+        
+        self._enrollment_cache.set(content_key, embedding)
+        return embedding
+    
     async def verify_user(self, phone: str, listen_url: str) -> Tuple[bool, str, Optional[float]]:
         """
         Verify user identity through voice authentication.
         
         Complete verification workflow:
-        1. Fetch stored user embedding from database
-        2. Capture live audio from VAPI WebSocket
-        3. Generate embedding from captured audio
+        1. Fetch stored user embedding (in-process cache, then database)
+        2. Stream live audio from VAPI WebSocket, concurrently with step 1
+        3. Generate embedding from the captured samples
         4. Compare embeddings and compute similarity score
         5. Log authentication attempt
         6. Return verification result
@@ -185,59 +305,90 @@ class AuthenticationService:
         try:
             logger.info(f"Starting verification for user {phone}")
             
-            # Step 1: Fetch stored user embedding
-            try:
-                stored_user = await self.db.users.get_user_by_phone(phone)
-                if not stored_user:
-                    logger.warning(f"User {phone} not found in database")
-                    await self._log_auth_attempt(phone, False, 0.0)
-                    return False, "User not enrolled for voice authentication", None
-                
-                logger.info(f"Retrieved stored embedding for user {phone}")
-                
-            except Exception as e:
-                logger.error(f"Database error retrieving user {phone}: {e}")
-                raise VerificationError(f"Failed to retrieve user data: {e}")
+            # Step 1: Start fetching the stored user embedding; the lookup runs
+            # while the VAPI connection opens and audio is captured
+            stored_embedding_task = asyncio.create_task(self._get_user_embedding(phone))
+            stored_embedding = None
             
-            # Step 2: Capture live audio from VAPI
+            # Step 2: Stream live audio from VAPI
             try:
                 logger.info(f"Capturing live audio from VAPI: {listen_url}")
-                captured_audio = await capture_audio_from_vapi(
+                pcm_buffer = bytearray()
+                live_embedding = None
+                checkpoints = sorted(settings.early_decision_checkpoints) if settings.early_decision_enabled else []
+                
+                async with aclosing(stream_audio_from_vapi(
                     listen_url=listen_url,
                     min_duration=3.0,  # Minimum 3 seconds of audio
                     silence_threshold=0.01,  # RMS threshold for silence
                     silence_duration=2.0,  # 2 seconds of silence to stop
                     max_duration=30.0,  # Maximum 30 seconds
                     connection_timeout=10.0  # 10 second connection timeout
-                )
+                )) as stream:
+                    async for pcm_chunk in stream:
+                        pcm_buffer.extend(pcm_chunk)
+                        
+                        # Stop capturing as soon as the user turns out not to be enrolled
+                        if stored_embedding is None and stored_embedding_task.done():
+                            stored_embedding = await self._await_stored_embedding(phone, stored_embedding_task)
+                            if stored_embedding is None:
+                                break
+                        
+                        # Score a partial embedding at each checkpoint and stop
+                        # capturing as soon as the outcome is clear
+                        captured_seconds = len(pcm_buffer) / (2 * LIVE_AUDIO_SAMPLE_RATE)
+                        if checkpoints and captured_seconds >= checkpoints[0]:
+                            checkpoints = [c for c in checkpoints if c > captured_seconds]
+                            if stored_embedding is None:
+                                stored_embedding = await self._await_stored_embedding(phone, stored_embedding_task)
+                                if stored_embedding is None:
+                                    break
+                            live_embedding = await self._early_decision_embedding(phone, stored_embedding, pcm_buffer)
+                            if live_embedding is not None:
+                                break
+                
+                if stored_embedding is None:
+                    stored_embedding = await self._await_stored_embedding(phone, stored_embedding_task)
+                    if stored_embedding is None:
+                        logger.warning(f"User {phone} not found in database")
+                        await self._log_auth_attempt(phone, False, 0.0)
+                        return False, "User not enrolled for voice authentication", None
+                
+                # Decode 16-bit PCM straight to float samples (no WAV/temp file round trip)
+                live_waveform = self._decode_pcm(pcm_buffer)
                 
                 # Validate captured audio duration
-                duration = get_audio_duration(captured_audio)
+                duration = len(live_waveform) / LIVE_AUDIO_SAMPLE_RATE
                 if duration < 1.0:
                     logger.warning(f"Captured audio too short: {duration:.1f}s")
                     await self._log_auth_attempt(phone, False, 0.0)
                     return False, "Captured audio too short for verification", None
                 
-                logger.info(f"Captured audio: {len(captured_audio)} bytes, {duration:.1f}s duration")
+                logger.info(f"Captured audio: {len(pcm_buffer)} bytes, {duration:.1f}s duration")
                 
             except VAPIConnectionError as e:
                 logger.error(f"VAPI connection failed for user {phone}: {e}")
                 await self._log_auth_attempt(phone, False, 0.0)
-                raise VerificationError(f"Failed to connect to audio stream: {e}")
+                raise VerificationConnectionError(f"Failed to connect to audio stream: {e}")
             except VAPIAudioError as e:
                 logger.error(f"VAPI audio capture failed for user {phone}: {e}")
                 await self._log_auth_attempt(phone, False, 0.0)
-                raise VerificationError(f"Failed to capture audio: {e}")
+                raise VerificationAudioError(f"Failed to capture audio: {e}")
+            finally:
+                # Capture failed or the request was cancelled before the lookup finished
+                stored_embedding_task.cancel()
             
-            # Step 3: Generate embedding from captured audio
+            # Step 3: Generate embedding from captured audio (unless decided early)
             try:
-                # Save captured audio to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                    temp_file.write(captured_audio)
-                    temp_audio_path = temp_file.name
-                
-                # Generate embedding from captured audio
-                live_embedding = self.embedding_service.generate_embedding(temp_audio_path)
+                if live_embedding is None:
+                    if self._embedding_batcher is not None:
+                        live_embedding = await self._embedding_batcher.embed(live_waveform)
+                    else:
+                        live_embedding = await self._run_embedding(
+                            self.embedding_service.generate_embedding_from_waveform,
+                            live_waveform,
+                            LIVE_AUDIO_SAMPLE_RATE
+                        )
                 logger.info(f"Generated live embedding for user {phone}: shape {live_embedding.shape}")
                 
                 # Validate embedding
@@ -249,23 +400,15 @@ class AuthenticationService:
             except Exception as e:
                 logger.error(f"Live embedding generation failed for user {phone}: {e}")
                 await self._log_auth_attempt(phone, False, 0.0)
-                raise VerificationError(f"Failed to process captured audio: {e}")
-            finally:
-                # Cleanup temporary file
-                try:
-                    import os
-                    if 'temp_audio_path' in locals():
-                        os.unlink(temp_audio_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to cleanup temporary file: {cleanup_error}")
+                raise VerificationAudioError(f"Failed to process captured audio: {e}")
             
             # Step 4: Compare embeddings and compute similarity
             try:
-                is_match, similarity_score = self.embedding_service.verify_speaker(
-                    stored_user.embedding,
-                    live_embedding,
-                    threshold=self.voice_threshold
-                )
+                similarity_score = float(self.embedding_service.compute_cosine_similarity_batch(
+                    stored_embedding,
+                    live_embedding
+                ))
+                is_match = similarity_score >= self.voice_threshold
                 
                 logger.info(f"Voice comparison for user {phone}: similarity={similarity_score:.4f}, threshold={self.voice_threshold}, match={is_match}")
                 
@@ -303,25 +446,149 @@ class AuthenticationService:
                 logger.warning(f"Failed to log failed auth attempt: {log_error}")
             raise VerificationError(f"Verification failed: {e}")
     
+    async def _await_stored_embedding(self, phone: str, task: "asyncio.Task[Optional[np.ndarray]]") -> Optional[np.ndarray]:
+        """
+        Wait for the stored embedding lookup started by verify_user.
+        
+        Args:
+            phone: User's phone number
+            task: Task running _get_user_embedding(phone)
+            
+        Returns:
+            Stored embedding, or None if the user is not enrolled
+            
+        Raises:
+            VerificationError: If the lookup failed
+        """
+        try:
+            stored_embedding = await task
+        except Exception as e:
+            logger.error(f"Database error retrieving user {phone}: {e}")
+            raise VerificationError(f"Failed to retrieve user data: {e}")
+        
+        if stored_embedding is not None:
+            logger.info(f"Retrieved stored embedding for user {phone}")
+        return stored_embedding
+    
+    @staticmethod
+    def _decode_pcm(pcm_buffer: bytearray) -> np.ndarray:
+        """Decode 16-bit little-endian PCM into float32 samples in [-1, 1]."""
+        sample_count = len(pcm_buffer) // 2
+        return np.frombuffer(pcm_buffer, dtype=np.int16, count=sample_count).astype(np.float32) / 32768.0
+    
+    @staticmethod
+    async def _run_embedding(func, *args) -> np.ndarray:
+        """Run a blocking embedding call on the embedding executor."""
+        return await asyncio.get_running_loop().run_in_executor(_embedding_executor, func, *args)
+    
+    async def _early_decision_embedding(
+        self,
+        phone: str,
+        stored_embedding: np.ndarray,
+        pcm_buffer: bytearray
+    ) -> Optional[np.ndarray]:
+        """
+        Embed the audio captured so far and check whether the outcome is already clear.
+        
+        Args:
+            phone: User's phone number (for logging)
+            stored_embedding: Normalized enrolled embedding
+            pcm_buffer: PCM audio captured so far
+            
+        Returns:
+            The partial embedding if its score is at or above the early-accept
+            threshold or at or below the early-reject threshold, otherwise None
+        """
+        try:
+            partial_embedding = await self._run_embedding(
+                self.embedding_service.generate_embedding_from_waveform,
+                self._decode_pcm(pcm_buffer),
+                LIVE_AUDIO_SAMPLE_RATE
+            )
+            score = float(self.embedding_service.compute_cosine_similarity_batch(
+                stored_embedding, partial_embedding
+            ))
+        except Exception as e:
+            logger.debug(f"Partial embedding failed for user {phone}, continuing capture: {e}")
+            return None
+        
+        seconds = len(pcm_buffer) / (2 * LIVE_AUDIO_SAMPLE_RATE)
+        if score >= settings.early_accept_threshold or score <= settings.early_reject_threshold:
+            logger.info(f"Early verification decision for user {phone} after {seconds:.2f}s: similarity={score:.4f}")
+            return partial_embedding
+        
+        logger.debug(f"No early decision for user {phone} after {seconds:.2f}s: similarity={score:.4f}")
+        return None
+    
+    async def _get_user_embedding(self, phone: str) -> Optional[np.ndarray]:
+        """
+        Get a user's enrolled embedding, consulting the in-process cache first.
+        
+        Args:
+            phone: User's phone number
+            
+        Returns:
+            L2-normalized float32 stored embedding, or None if the user is not enrolled
+        """
+        embedding = self._user_embedding_cache.get(phone)
+        if embedding is not None:
+            logger.debug(f"User embedding cache hit for {phone}")
+            return embedding.astype(np.float32)
+        
+        fetch = self._user_embedding_fetches.get(phone)
+        if fetch is None:
+            fetch = asyncio.create_task(self._fetch_user_embedding(phone))
+            self._user_embedding_fetches[phone] = fetch
+            fetch.add_done_callback(lambda task: self._forget_user_embedding_fetch(phone, task))
+        
+        # Shielded so one caller giving up doesn't cancel the fetch for the rest
+        return await asyncio.shield(fetch)
+    
+    async def _fetch_user_embedding(self, phone: str) -> Optional[np.ndarray]:
+        """
+        Load a user's embedding from the database and populate the cache.
+        
+        The cache is only written while this is still the registered lookup
+        for the phone; enrollment detaches lookups that may have read the
+        previous embedding.
+        """
+        stored_user = await self.db.users.get_user_by_phone(phone)
+        if not stored_user:
+            return None
+        
+        normalized = self.embedding_service.normalize_embedding(stored_user.embedding)
+        if self._user_embedding_fetches.get(phone) is asyncio.current_task():
+            self._user_embedding_cache.set(phone, normalized.astype(np.float16))
+        return normalized
+    
+    def _forget_user_embedding_fetch(self, phone: str, task: asyncio.Task) -> None:
+        """Unregister a finished lookup, unless a newer one has replaced it."""
+        if self._user_embedding_fetches.get(phone) is task:
+            del self._user_embedding_fetches[phone]
+    
     async def _log_auth_attempt(self, phone: str, success: bool, score: float) -> None:
         """
         Log authentication attempt to database.
         
+        The row is queued and written by the repository's batched background
+        writer, so this never waits on the database.
+        
         Args:
             phone: User's phone number
             success: Whether authentication was successful
             score: Similarity score from voice comparison
         """
         try:
+            # Cosine similarity can be negative; the score column only accepts [0, 1]
+            score = min(max(score, 0.0), 1.0)
             auth_attempt = AuthAttempt(
                 phone=phone,
                 success=success,
-                score=score,
-                created_at=datetime.utcnow()
+                score=score
             )
             
-            await self.db.auth_attempts.create_auth_attempt(auth_attempt)
-            logger.debug(f"Logged auth attempt for user {phone}: success={success}, score={score:.4f}")
+            self.db.auth_attempts.enqueue_auth_attempt(auth_attempt)
+            logger.debug(f"Queued auth attempt for user {phone}: success={success}, score={score:.4f}")
             
         except Exception as e:
             logger.error(f"Failed to log auth attempt for user {phone}: {e}")
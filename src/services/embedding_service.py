@@ -2,33 +2,63 @@
 Embedding service for generating speaker embeddings using SpeechBrain ECAPA-TDNN model.
 """
 
+import asyncio
+import contextlib
+import hashlib
+import io
 import logging
+import math
 import os
 import tempfile
+import wave
+from concurrent.futures import Executor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 import numpy as np
 import torch
 import torchaudio
 from speechbrain.inference import EncoderClassifier
 
+from src.config import settings
+
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=8)
+def _get_resampler(orig_freq: int) -> torchaudio.transforms.Resample:
+    """Build (once per source rate) a resampler to the model's 16kHz input rate."""
+    return torchaudio.transforms.Resample(orig_freq, 16000)
+
+
+def _row_norms(matrix: np.ndarray) -> np.ndarray:
+    """L2 norm of each row as an (N, 1) column, with zero norms replaced by 1."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return norms
+
+
 class EmbeddingService:
     """Service for generating speaker embeddings using SpeechBrain ECAPA-TDNN model."""
     
-    def __init__(self, model_cache_dir: Optional[str] = None):
+    def __init__(self, model_cache_dir: Optional[str] = None, optimize_model: bool = False,
+                 bf16_autocast: bool = False):
         """
         Initialize the embedding service.
         
         Args:
             model_cache_dir: Directory to cache the model files. If None, uses system temp dir.
+            optimize_model: Replace the ECAPA encoder with a traced, frozen
+                TorchScript module after loading (see _optimize_embedding_model)
+            bf16_autocast: Run forward passes under bfloat16 CPU autocast;
+                embeddings are still returned as float32
         """
         self.model_cache_dir = model_cache_dir or os.path.join(tempfile.gettempdir(), "speechbrain_models")
         self.model: Optional[EncoderClassifier] = None
         self._model_loaded = False
+        self._optimize_model = optimize_model
+        self._bf16_autocast = bf16_autocast
         
         # Ensure CPU-only mode for Render deployment
         torch.set_num_threads(1)
@@ -54,6 +84,9 @@ class EmbeddingService:
                 run_opts={"device": "cpu"}  # Force CPU-only mode
             )
             
+            if self._optimize_model:
+                self._optimize_embedding_model()
+            
             self._model_loaded = True
             logger.info("SpeechBrain ECAPA-TDNN model loaded successfully")
             
@@ -61,6 +94,108 @@ class EmbeddingService:
             logger.error(f"Failed to load SpeechBrain model: {e}")
             raise RuntimeError(f"Model loading failed: {e}")
     
+    def _optimize_embedding_model(self) -> None:
+        """
+        Swap the ECAPA encoder for a traced, frozen TorchScript module.
+        
+        ECAPA_TDNN cannot be compiled with torch.jit.script (it indexes a
+        ModuleList with a loop variable), so it is traced in eval mode on dummy
+        features instead; its forward has no data-dependent control flow, so
+        the trace holds for any batch size and length. The frozen trace embeds
+        the weights, so it is cached in model_cache_dir under a name keyed by
+        the checkpoint's hash and the torch version (see _frozen_model_path)
+        and written atomically, so workers starting together never load a
+        partial file. An unreadable cache file is re-traced. Falls back to the
+        eager module if tracing fails.
+        """
+        embedding_model = self.model.mods.embedding_model.eval()
+        
+        try:
+            cache_path = self._frozen_model_path()
+            frozen = None
+            if cache_path is not None and cache_path.exists():
+                try:
+                    frozen = torch.jit.load(str(cache_path), map_location="cpu")
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable TorchScript cache {cache_path}: {e}")
+            
+            if frozen is None:
+                with torch.no_grad():
+                    features = self.model.mods.compute_features(torch.zeros(1, 16000))
+                    traced = torch.jit.trace(embedding_model, (features, torch.ones(1)), check_trace=False)
+                frozen = torch.jit.freeze(traced)
+                if cache_path is not None:
+                    try:
+                        self._save_frozen_model(frozen, cache_path)
+                    except Exception as e:
+                        logger.warning(f"Could not cache TorchScript encoder at {cache_path}: {e}")
+            
+            # Conv/batch-norm folding and CPU fusions; machine-specific, so applied
+            # after loading rather than cached
+            self.model.mods.embedding_model = torch.jit.optimize_for_inference(frozen)
+            logger.info("ECAPA encoder replaced with frozen TorchScript module")
+            
+        except Exception as e:
+            logger.warning(f"TorchScript optimization failed, using eager encoder: {e}")
+    
+    def _frozen_model_path(self) -> Optional[Path]:
+        """
+        Path of the cached frozen encoder for the current checkpoint.
+        
+        Returns:
+            Path keyed by the encoder checkpoint's SHA-256 and the torch
+            version, or None if the checkpoint file is not in model_cache_dir
+            (the trace is then not cached)
+        """
+        checkpoint = Path(self.model_cache_dir) / "embedding_model.ckpt"
+        if not checkpoint.exists():
+            return None
+        
+        digest = hashlib.sha256()
+        with open(checkpoint, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return Path(self.model_cache_dir) / (
+            f"embedding_model_frozen_{digest.hexdigest()[:16]}_torch{torch.__version__}.pt"
+        )
+    
+    @staticmethod
+    def _save_frozen_model(frozen: torch.jit.ScriptModule, cache_path: Path) -> None:
+        """Write the frozen encoder to a temporary file and rename it into place."""
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            torch.jit.save(frozen, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    
+    def _inference_context(self) -> contextlib.ExitStack:
+        """Enter inference mode, plus bfloat16 autocast when enabled, for a forward pass."""
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self._bf16_autocast:
+            stack.enter_context(torch.autocast(device_type="cpu", dtype=torch.bfloat16))
+        return stack
+    
+    def warmup(self) -> None:
+        """
+        Load the model and run one dummy forward pass.
+        
+        Called at startup so the first enrollment or verification request does
+        not pay for model download, construction and first-call allocation.
+        
+        Raises:
+            RuntimeError: If model loading fails
+        """
+        self._load_model()
+        
+        with self._inference_context():
+            self.model.encode_batch(torch.zeros(1, 16000))
+        
+        logger.info("SpeechBrain ECAPA-TDNN model warmed up")
+    
     def generate_embedding(self, audio_path: str) -> np.ndarray:
         """
         Generate a 192-dimensional speaker embedding from an audio file.
@@ -69,7 +204,7 @@ class EmbeddingService:
             audio_path: Path to the audio file (WAV format, 16kHz mono recommended)
             
         Returns:
-            numpy.ndarray: 192-dimensional speaker embedding vector
+            numpy.ndarray: 192-dimensional unit-length speaker embedding vector
             
         Raises:
             RuntimeError: If model loading or embedding generation fails
@@ -87,46 +222,179 @@ class EmbeddingService:
             
             # Load and preprocess audio
             waveform, sample_rate = torchaudio.load(audio_path)
+            return self._embed_waveform(waveform, sample_rate)
             
-            # Validate audio
-            if waveform.shape[1] < sample_rate * 0.5:  # Less than 0.5 seconds
-                raise ValueError("Audio file too short (minimum 0.5 seconds required)")
-            
-            # Convert to mono if stereo
-            if waveform.shape[0] > 1:
-                waveform = torch.mean(waveform, dim=0, keepdim=True)
-            
-            # Resample to 16kHz if needed (ECAPA model expects 16kHz)
-            if sample_rate != 16000:
-                resampler = torchaudio.transforms.Resample(sample_rate, 16000)
-                waveform = resampler(waveform)
+        except ValueError as e:
+            # Re-raise ValueError as-is (for validation errors like audio too short)
+            raise e
+        except Exception as e:
+            logger.error(f"Failed to generate embedding for {audio_path}: {e}")
+            raise RuntimeError(f"Embedding generation failed: {e}")
+    
+    def generate_embedding_from_waveform(self, waveform: np.ndarray, sample_rate: int = 16000) -> np.ndarray:
+        """
+        Generate a 192-dimensional speaker embedding from an in-memory waveform.
+        
+        Avoids the WAV encode, temp file and decode round trip when audio is
+        already available as samples (e.g. streamed from VAPI).
+        
+        Args:
+            waveform: Mono float32 samples in [-1, 1]
+            sample_rate: Sample rate of the waveform in Hz
             
-            # Generate embedding using the model
-            with torch.no_grad():
-                embeddings = self.model.encode_batch(waveform.unsqueeze(0))
-                embedding = embeddings.squeeze().cpu().numpy()
+        Returns:
+            numpy.ndarray: 192-dimensional unit-length speaker embedding vector
             
-            # Verify embedding dimensions (should be 192 for ECAPA-TDNN)
-            if embedding.shape[0] != 192:
-                raise RuntimeError(f"Unexpected embedding dimension: {embedding.shape[0]}, expected 192")
+        Raises:
+            RuntimeError: If model loading or embedding generation fails
+            ValueError: If audio is too short
+        """
+        self._load_model()
+        
+        try:
+            return self._embed_waveform(torch.from_numpy(waveform).unsqueeze(0), sample_rate)
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            logger.error(f"Failed to generate embedding from waveform: {e}")
+            raise RuntimeError(f"Embedding generation failed: {e}")
+    
+    def generate_embedding_from_bytes(self, audio_bytes: bytes) -> np.ndarray:
+        """
+        Generate a 192-dimensional speaker embedding from in-memory WAV bytes.
+        
+        Decodes the 16-bit PCM WAV produced by the audio pipeline directly,
+        without writing it to a temporary file for torchaudio to read back.
+        
+        Args:
+            audio_bytes: WAV file contents (16-bit PCM)
             
-            logger.debug(f"Generated embedding with shape: {embedding.shape}")
-            return embedding
+        Returns:
+            numpy.ndarray: 192-dimensional unit-length speaker embedding vector
             
+        Raises:
+            RuntimeError: If model loading or embedding generation fails
+            ValueError: If the audio is not 16-bit PCM WAV or is too short
+        """
+        try:
+            with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+                if wav_file.getsampwidth() != 2:
+                    raise ValueError(f"Expected 16-bit PCM WAV, got {wav_file.getsampwidth() * 8}-bit")
+                sample_rate = wav_file.getframerate()
+                channels = wav_file.getnchannels()
+                frames = wav_file.readframes(wav_file.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"Invalid WAV audio: {e}")
+        
+        # Interleaved int16 frames -> (channels, samples) float32 in [-1, 1]
+        samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+        waveform = torch.from_numpy(samples.reshape(-1, channels).T)
+        
+        self._load_model()
+        
+        try:
+            return self._embed_waveform(waveform, sample_rate)
         except ValueError as e:
-            # Re-raise ValueError as-is (for validation errors like audio too short)
             raise e
         except Exception as e:
-            logger.error(f"Failed to generate embedding for {audio_path}: {e}")
+            logger.error(f"Failed to generate embedding from WAV bytes: {e}")
             raise RuntimeError(f"Embedding generation failed: {e}")
     
-    def compute_cosine_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+    def generate_embeddings_from_waveforms(self, waveforms: List[np.ndarray],
+                                           sample_rate: int = 16000) -> List[np.ndarray]:
+        """
+        Generate speaker embeddings for several waveforms in one forward pass.
+        
+        Waveforms are zero-padded to the longest one and their relative
+        lengths are passed to the model, so padding does not affect the
+        pooled embeddings.
+        
+        Args:
+            waveforms: Mono float32 waveforms in [-1, 1]
+            sample_rate: Sample rate shared by all waveforms in Hz
+            
+        Returns:
+            List of 192-dimensional unit-length speaker embeddings, in input order
+            
+        Raises:
+            RuntimeError: If model loading or embedding generation fails
+            ValueError: If any waveform is too short
+        """
+        if not waveforms:
+            return []
+        
+        min_samples = sample_rate * 0.5
+        if any(len(waveform) < min_samples for waveform in waveforms):
+            raise ValueError("Audio file too short (minimum 0.5 seconds required)")
+        
+        self._load_model()
+        
+        try:
+            max_len = max(len(waveform) for waveform in waveforms)
+            batch = np.zeros((len(waveforms), max_len), dtype=np.float32)
+            for row, waveform in zip(batch, waveforms):
+                row[:len(waveform)] = waveform
+            relative_lengths = torch.tensor([len(waveform) / max_len for waveform in waveforms])
+            
+            batch_tensor = torch.from_numpy(batch)
+            if sample_rate != 16000:
+                batch_tensor = _get_resampler(sample_rate)(batch_tensor)
+            
+            with self._inference_context():
+                embeddings = self.model.encode_batch(batch_tensor, relative_lengths)
+                embeddings = embeddings.reshape(len(waveforms), -1).float().cpu().numpy()
+            embeddings = embeddings / _row_norms(embeddings)
+        except Exception as e:
+            logger.error(f"Failed to generate batched embeddings: {e}")
+            raise RuntimeError(f"Embedding generation failed: {e}")
+        
+        if embeddings.shape[1] != 192:
+            raise RuntimeError(f"Unexpected embedding dimension: {embeddings.shape[1]}, expected 192")
+        
+        logger.debug(f"Generated {len(waveforms)} embeddings in one batch")
+        return list(embeddings)
+    
+    def _embed_waveform(self, waveform: torch.Tensor, sample_rate: int) -> np.ndarray:
+        """Run the model on a (channels, samples) waveform tensor."""
+        # Validate audio
+        if waveform.shape[1] < sample_rate * 0.5:  # Less than 0.5 seconds
+            raise ValueError("Audio file too short (minimum 0.5 seconds required)")
+        
+        # Convert to mono if stereo
+        if waveform.shape[0] > 1:
+            waveform = torch.mean(waveform, dim=0, keepdim=True)
+        
+        # Resample to 16kHz if needed (ECAPA model expects 16kHz)
+        if sample_rate != 16000:
+            waveform = _get_resampler(sample_rate)(waveform)
+        
+        # Generate embedding using the model
+        with self._inference_context():
+            # encode_batch expects (batch, time); the mono waveform is already (1, time)
+            embeddings = self.model.encode_batch(waveform)
+            embedding = embeddings.squeeze().float().cpu().numpy()
+        
+        # Store unit-length vectors so similarity against them is a single dot
+        # product (a zero vector stays zero and fails validate_embedding)
+        embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+        
+        # Verify embedding dimensions (should be 192 for ECAPA-TDNN)
+        if embedding.shape[0] != 192:
+            raise RuntimeError(f"Unexpected embedding dimension: {embedding.shape[0]}, expected 192")
+        
+        logger.debug(f"Generated embedding with shape: {embedding.shape}")
+        return embedding
+    
+    def compute_cosine_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray,
+                                  assume_normalized: bool = False) -> float:
         """
         Compute cosine similarity between two embeddings.
         
         Args:
             embedding1: First embedding vector
             embedding2: Second embedding vector
+            assume_normalized: Both embeddings are already unit length (as
+                produced by this service), so the score is a single dot product
             
         Returns:
             float: Cosine similarity score between -1 and 1
@@ -141,21 +409,23 @@ class EmbeddingService:
             raise ValueError(f"Invalid embedding dimension: {embedding1.shape[0]}, expected 192")
         
         try:
-            # Normalize embeddings
-            norm1 = np.linalg.norm(embedding1)
-            norm2 = np.linalg.norm(embedding2)
+            if assume_normalized:
+                similarity = min(max(float(np.vdot(embedding1, embedding2)), -1.0), 1.0)
+                logger.debug(f"Computed cosine similarity: {similarity}")
+                return similarity
             
-            if norm1 == 0 or norm2 == 0:
-                raise ValueError("Cannot compute similarity with zero-norm embedding")
+            # Three BLAS dot products and one sqrt; cheaper to dispatch at 192
+            # dimensions than np.linalg.norm twice plus np.dot
+            denominator = math.sqrt(float(np.vdot(embedding1, embedding1)) * float(np.vdot(embedding2, embedding2)))
             
-            # Compute cosine similarity
-            similarity = np.dot(embedding1, embedding2) / (norm1 * norm2)
+            if denominator == 0:
+                raise ValueError("Cannot compute similarity with zero-norm embedding")
             
-            # Ensure result is in valid range [-1, 1]
-            similarity = np.clip(similarity, -1.0, 1.0)
+            # Compute cosine similarity, clamped to the valid range [-1, 1]
+            similarity = min(max(float(np.vdot(embedding1, embedding2)) / denominator, -1.0), 1.0)
             
             logger.debug(f"Computed cosine similarity: {similarity}")
-            return float(similarity)
+            return similarity
             
         except ValueError as e:
             # Re-raise ValueError as-is (for validation errors)
@@ -164,6 +434,55 @@ class EmbeddingService:
             logger.error(f"Failed to compute cosine similarity: {e}")
             raise RuntimeError(f"Similarity computation failed: {e}")
     
+    def normalize_embedding(self, embedding: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize an embedding so cosine similarity reduces to a dot product.
+        
+        Args:
+            embedding: Embedding vector to normalize
+            
+        Returns:
+            numpy.ndarray: Unit-length float32 copy of the embedding
+            
+        Raises:
+            ValueError: If the embedding has zero norm
+        """
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            raise ValueError("Cannot normalize zero-norm embedding")
+        return embedding / norm
+    
+    def compute_cosine_similarity_batch(self, normalized_embeddings: np.ndarray,
+                                        embedding: np.ndarray) -> np.ndarray:
+        """
+        Score an embedding against pre-normalized embeddings in one BLAS call.
+        
+        Callers scoring against many enrolled embeddings should stack them
+        into one (N, 192) float32 matrix once and reuse it, rather than
+        rebuilding it per request or looping over compute_cosine_similarity.
+        
+        Args:
+            normalized_embeddings: Unit-length embedding of shape (192,) or a
+                stacked matrix of shape (N, 192)
+            embedding: Embedding to score (normalized internally)
+            
+        Returns:
+            numpy.ndarray: Cosine similarity scores in [-1, 1]; a 0-d array for
+            a single enrolled embedding, shape (N,) for a matrix
+            
+        Raises:
+            ValueError: If dimensions don't match or the embedding has zero norm
+        """
+        if normalized_embeddings.shape[-1] != embedding.shape[-1]:
+            raise ValueError(
+                f"Embedding dimensions don't match: {normalized_embeddings.shape} vs {embedding.shape}"
+            )
+        
+        # C-contiguous float32 so the product runs as a single sgemv/sdot
+        scores = np.ascontiguousarray(normalized_embeddings, dtype=np.float32) @ self.normalize_embedding(embedding)
+        return np.clip(scores, -1.0, 1.0)
+    
     def verify_speaker(self, embedding1: np.ndarray, embedding2: np.ndarray, threshold: float = 0.82) -> tuple[bool, float]:
         """
         Verify if two embeddings belong to the same speaker.
@@ -237,6 +556,119 @@ class EmbeddingService:
         }
 
 
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into batched forward passes.
+    
+    Requests arriving within max_wait seconds of the first queued one (up to
+    max_batch_size) share a single model call, run on the given executor.
+    """
+    
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        executor: Executor,
+        max_batch_size: int = 16,
+        max_wait: float = 0.01,
+        sample_rate: int = 16000
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            embedding_service: Service whose model runs the batches
+            executor: Executor the blocking forward passes run on
+            max_batch_size: Maximum waveforms per forward pass
+            max_wait: Seconds to wait for more requests after the first
+            sample_rate: Sample rate of every submitted waveform in Hz
+        """
+        self.embedding_service = embedding_service
+        self._executor = executor
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._sample_rate = sample_rate
+        
+        # Started on first use, like the auth attempt writer
+        self._queue: "asyncio.Queue[Tuple[np.ndarray, asyncio.Future]]" = asyncio.Queue()
+        self._batch_task: Optional[asyncio.Task] = None
+    
+    async def embed(self, waveform: np.ndarray) -> np.ndarray:
+        """
+        Generate an embedding for a waveform as part of the next batch.
+        
+        Args:
+            waveform: Mono float32 samples in [-1, 1] at the batcher's sample rate
+            
+        Returns:
+            numpy.ndarray: 192-dimensional unit-length speaker embedding vector
+            
+        Raises:
+            RuntimeError: If embedding generation fails
+            ValueError: If the waveform is too short
+        """
+        # Rejected up front so one short clip cannot fail a whole batch
+        if len(waveform) < self._sample_rate * 0.5:
+            raise ValueError("Audio file too short (minimum 0.5 seconds required)")
+        
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._batch_loop())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((waveform, future))
+        return await future
+    
+    async def _batch_loop(self) -> None:
+        """Collect queued waveforms into batches and resolve each request's future."""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self._max_wait
+            
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Callers that gave up (e.g. request cancelled) are dropped
+            batch = [(waveform, future) for waveform, future in batch if not future.done()]
+            if not batch:
+                continue
+            
+            try:
+                embeddings = await loop.run_in_executor(
+                    self._executor,
+                    self.embedding_service.generate_embeddings_from_waveforms,
+                    [waveform for waveform, _ in batch],
+                    self._sample_rate
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+    
+    async def close(self) -> None:
+        """Stop the batching task."""
+        if self._batch_task is None:
+            return
+        
+        self._batch_task.cancel()
+        try:
+            await self._batch_task
+        except asyncio.CancelledError:
+            pass
+        self._batch_task = None
+
+
 # Global instance for reuse across requests
 _embedding_service: Optional[EmbeddingService] = None
 
@@ -250,5 +682,8 @@ def get_embedding_service() -> EmbeddingService:
     """
     global _embedding_service
     if _embedding_service is None:
-        _embedding_service = EmbeddingService()
+        _embedding_service = EmbeddingService(
+            optimize_model=settings.embedding_torchscript,
+            bf16_autocast=settings.embedding_bf16_autocast
+        )
     return _embedding_service
\ No newline at end of file
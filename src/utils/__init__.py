@@ -10,6 +10,8 @@ from .audio_utils import (
     process_audio_for_enrollment,
     validate_audio_format,
 )
+from .cache import TTLCache
+from .log_utils import BufferedLogWriter
 
 __all__ = [
     "AudioDownloadError",
@@ -20,4 +22,6 @@ __all__ = [
     "pcm_to_wav",
     "process_audio_for_enrollment",
     "validate_audio_format",
+    "TTLCache",
+    "BufferedLogWriter",
 ]
\ No newline at end of file
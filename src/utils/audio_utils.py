@@ -11,17 +11,47 @@ This module provides functions for:
 import asyncio
 import io
 import logging
+import os
+import shutil
 import struct
 import tempfile
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
+from urllib.parse import urlparse
 
 import ffmpeg
 import httpx
 import numpy as np
 
+from src.config import settings
+
 logger = logging.getLogger(__name__)
 
+# Canonical audio format for the embedding model: 16kHz mono 16-bit PCM. All
+# ffmpeg paths resample at ingest so nothing downstream has to.
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+FFMPEG_TARGET_ARGS = ('-ac', str(TARGET_CHANNELS), '-ar', str(TARGET_SAMPLE_RATE), '-sample_fmt', 's16')
+
+# Bounds concurrent ffmpeg processes. Conversions stream the download through
+# ffmpeg, so each process spends most of its life idle on the network rather
+# than on a core; the default of 4x the CPU count keeps cores busy under a burst
+# of uploads without letting it spawn unbounded processes
+FFMPEG_SEM = asyncio.Semaphore(settings.ffmpeg_concurrency or 4 * (os.cpu_count() or 1))
+
+# Containers whose index may sit at the end of the file (the MP4 'moov' atom,
+# as most phone and desktop recorders write it), so ffmpeg needs seekable
+# input; these are downloaded to a temp file instead of piped
+SEEKABLE_INPUT_EXTENSIONS = frozenset({'.mp4', '.m4a', '.aac', '.mov', '.3gp'})
+SEEKABLE_INPUT_CONTENT_TYPES = frozenset({
+    'audio/mp4', 'audio/m4a', 'audio/x-m4a', 'audio/aac', 'audio/x-aac',
+    'audio/3gpp', 'video/mp4', 'video/quicktime'
+})
+
+# Downloads are mirrored in memory up to this size, then on disk
+SPOOL_MAX_MEMORY_BYTES = 8 * 1024 * 1024
+
 
 class AudioProcessingError(Exception):
     """Raised when audio processing operations fail."""
@@ -72,6 +102,27 @@ async def download_audio_file(url: str, timeout: int = 30) -> bytes:
         raise AudioDownloadError(f"Failed to download audio: {e}")
 
 
+@lru_cache(maxsize=8)
+def _wav_header_template(sample_rate: int, channels: int, sample_width: int) -> bytes:
+    """Build a 44-byte PCM WAV header for a format, with both size fields zeroed."""
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF',                               # Chunk ID
+        0,                                     # Chunk size (patched per call)
+        b'WAVE',                               # Format
+        b'fmt ',                               # Subchunk1 ID
+        16,                                    # Subchunk1 size (PCM)
+        1,                                     # Audio format (PCM)
+        channels,                              # Number of channels
+        sample_rate,                           # Sample rate
+        sample_rate * channels * sample_width, # Byte rate
+        channels * sample_width,               # Block align
+        sample_width * 8,                      # Bits per sample
+        b'data',                               # Subchunk2 ID
+        0                                      # Subchunk2 size (patched per call)
+    )
+
+
 def pcm_to_wav(pcm_data: bytes, sample_rate: int = 16000, channels: int = 1, 
                sample_width: int = 2) -> bytes:
     """
@@ -93,31 +144,13 @@ def pcm_to_wav(pcm_data: bytes, sample_rate: int = 16000, channels: int = 1,
         if not pcm_data:
             raise AudioProcessingError("PCM data is empty")
             
-        # Calculate WAV header parameters
+        # Fill in the size fields of the cached header for this format
         data_size = len(pcm_data)
-        file_size = data_size + 36  # 44 byte header - 8 bytes
-        byte_rate = sample_rate * channels * sample_width
-        block_align = channels * sample_width
+        wav_header = bytearray(_wav_header_template(sample_rate, channels, sample_width))
+        struct.pack_into('<I', wav_header, 4, data_size + 36)  # 44 byte header - 8 bytes
+        struct.pack_into('<I', wav_header, 40, data_size)
         
-        # Create WAV header
-        wav_header = struct.pack(
-            '<4sI4s4sIHHIIHH4sI',
-            b'RIFF',           # Chunk ID
-            file_size,         # Chunk size
-            b'WAVE',           # Format
-            b'fmt ',           # Subchunk1 ID
-            16,                # Subchunk1 size (PCM)
-            1,                 # Audio format (PCM)
-            channels,          # Number of channels
-            sample_rate,       # Sample rate
-            byte_rate,         # Byte rate
-            block_align,       # Block align
-            sample_width * 8,  # Bits per sample
-            b'data',           # Subchunk2 ID
-            data_size          # Subchunk2 size
-        )
-        
-        wav_data = wav_header + pcm_data
+        wav_data = b''.join((wav_header, pcm_data))
         logger.info(f"Converted {len(pcm_data)} bytes PCM to {len(wav_data)} bytes WAV")
         
         return wav_data
@@ -163,14 +196,15 @@ async def convert_to_16khz_mono(audio_data: bytes, input_format: Optional[str] =
             stream = ffmpeg.output(
                 stream,
                 output_file.name,
-                acodec='pcm_s16le',  # 16-bit PCM
-                ac=1,                # Mono (1 channel)
-                ar=16000,            # 16kHz sample rate
-                f='wav'              # WAV format
+                acodec='pcm_s16le',      # 16-bit PCM
+                ac=TARGET_CHANNELS,      # Mono (1 channel)
+                ar=TARGET_SAMPLE_RATE,   # 16kHz sample rate
+                f='wav'                  # WAV format
             )
             
-            # Run ffmpeg conversion
-            ffmpeg.run(stream, overwrite_output=True, quiet=True)
+            # Run ffmpeg conversion off the event loop
+            async with FFMPEG_SEM:
+                await asyncio.to_thread(ffmpeg.run, stream, overwrite_output=True, quiet=True)
             
             # Read converted audio data
             output_file.seek(0)
@@ -192,6 +226,202 @@ async def convert_to_16khz_mono(audio_data: bytes, input_format: Optional[str] =
         raise AudioProcessingError(f"Audio conversion failed: {e}")
 
 
+async def stream_audio_to_16khz_mono(url: str, timeout: int = 30,
+                                     max_file_size_mb: int = 50) -> bytes:
+    """
+    Download audio and convert it to 16kHz mono WAV, overlapping the two.
+    
+    Response chunks are piped straight into ffmpeg's stdin while its raw PCM
+    output is drained concurrently, so the transcode overlaps the download.
+    Containers that need seekable input (MP4/M4A/AAC, whose index may sit at
+    the end of the file) are downloaded first and converted from a temp file,
+    as is any input ffmpeg fails to decode from the pipe.
+    
+    Args:
+        url: URL to download audio from
+        timeout: Request timeout in seconds
+        max_file_size_mb: Maximum accepted download size in megabytes
+        
+    Returns:
+        Converted audio data as 16kHz mono WAV bytes
+        
+    Raises:
+        AudioDownloadError: If download fails or exceeds the size limit
+        AudioProcessingError: If conversion fails
+    """
+    async with FFMPEG_SEM:
+        pcm_data = await _stream_through_ffmpeg(url, timeout, max_file_size_mb)
+    
+    return pcm_to_wav(pcm_data, sample_rate=TARGET_SAMPLE_RATE, channels=TARGET_CHANNELS, sample_width=2)
+
+
+def _needs_seekable_input(url: str, content_type: Optional[str] = None) -> bool:
+    """Whether the audio at url is a container ffmpeg cannot reliably decode from a pipe."""
+    media_type = (content_type or '').split(';', 1)[0].strip().lower()
+    if media_type in SEEKABLE_INPUT_CONTENT_TYPES:
+        return True
+    return Path(urlparse(url).path).suffix.lower() in SEEKABLE_INPUT_EXTENSIONS
+
+
+async def _start_ffmpeg(input_path: str) -> asyncio.subprocess.Process:
+    """Start ffmpeg converting input_path ('pipe:0' for stdin) to raw 16kHz mono PCM on stdout."""
+    try:
+        return await asyncio.create_subprocess_exec(
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', input_path,
+            *FFMPEG_TARGET_ARGS, '-f', 's16le', '-acodec', 'pcm_s16le',
+            'pipe:1',
+            stdin=asyncio.subprocess.PIPE if input_path == 'pipe:0' else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError as e:
+        logger.error(f"ffmpeg executable not found: {e}")
+        raise AudioProcessingError("Audio conversion failed: ffmpeg executable not found")
+
+
+async def _stop_ffmpeg(process: asyncio.subprocess.Process) -> None:
+    """Kill ffmpeg if it is still running and reap it."""
+    if process.returncode is None:
+        process.kill()
+        await process.wait()
+
+
+def _ffmpeg_error(returncode: int, stderr: bytes) -> str:
+    """Describe a failed ffmpeg run from its stderr, or its exit code if silent."""
+    return stderr.decode(errors='replace').strip() or f"exit code {returncode}"
+
+
+async def _stream_through_ffmpeg(url: str, timeout: int, max_file_size_mb: int) -> bytes:
+    """Download the audio at url and return it as raw 16kHz mono PCM."""
+    max_bytes = max_file_size_mb * 1024 * 1024
+    
+    # Every downloaded byte is mirrored here (in memory, spilling to disk past
+    # SPOOL_MAX_MEMORY_BYTES) so a failed pipe conversion can be retried from
+    # a seekable copy without downloading again
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_BYTES) as spool:
+        # Start ffmpeg before connecting so its startup overlaps the request
+        process = None if _needs_seekable_input(url) else await _start_ffmpeg('pipe:0')
+        returncode, pcm_data, stderr = None, b'', b''
+        
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                logger.info(f"Streaming audio from URL: {url}")
+                async with client.stream('GET', url) as response:
+                    response.raise_for_status()
+                    
+                    if process is not None and _needs_seekable_input(url, response.headers.get('content-type')):
+                        await _stop_ffmpeg(process)
+                        process = None
+                    
+                    if process is None:
+                        async for chunk in response.aiter_bytes():
+                            _spool_chunk(spool, chunk, max_bytes, max_file_size_mb)
+                    else:
+                        returncode, pcm_data, stderr = await _pipe_through_ffmpeg(
+                            process, response, spool, max_bytes, max_file_size_mb
+                        )
+        except AudioDownloadError:
+            raise
+        except httpx.TimeoutException as e:
+            logger.error(f"Timeout downloading audio from {url}: {e}")
+            raise AudioDownloadError(f"Timeout downloading audio: {e}")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error downloading audio from {url}: {e}")
+            raise AudioDownloadError(f"HTTP error downloading audio: {e.response.status_code}")
+        except httpx.HTTPError as e:
+            logger.error(f"Unexpected error downloading audio from {url}: {e}")
+            raise AudioDownloadError(f"Failed to download audio: {e}")
+        finally:
+            if process is not None:
+                await _stop_ffmpeg(process)
+        
+        bytes_received = spool.tell()
+        if bytes_received == 0:
+            raise AudioDownloadError("Downloaded audio file is empty")
+        
+        if returncode == 0 and pcm_data:
+            logger.info(f"Streamed {bytes_received} bytes through ffmpeg to {len(pcm_data)} bytes of 16kHz mono PCM")
+            return pcm_data
+        
+        if process is not None:
+            logger.warning(
+                f"ffmpeg could not decode piped input ({_ffmpeg_error(returncode, stderr)}); "
+                f"retrying from a seekable copy"
+            )
+        return await _convert_spooled_audio(spool)
+
+
+def _spool_chunk(spool, chunk: bytes, max_bytes: int, max_file_size_mb: int) -> None:
+    """Append a downloaded chunk to the spool, enforcing the download size limit."""
+    if spool.tell() + len(chunk) > max_bytes:
+        raise AudioDownloadError(f"Audio file exceeds maximum size of {max_file_size_mb} MB")
+    spool.write(chunk)
+
+
+async def _pipe_through_ffmpeg(process: asyncio.subprocess.Process, response: httpx.Response,
+                               spool, max_bytes: int, max_file_size_mb: int) -> Tuple[int, bytes, bytes]:
+    """Feed the response body to ffmpeg's stdin and return (returncode, pcm_data, stderr)."""
+    async def feed_stdin() -> None:
+        piping = True
+        try:
+            async for chunk in response.aiter_bytes():
+                _spool_chunk(spool, chunk, max_bytes, max_file_size_mb)
+                if not piping:
+                    continue
+                try:
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    # ffmpeg exited early (e.g. undecodable input); keep
+                    # spooling so the retry has the whole file
+                    piping = False
+        except Exception:
+            if process.returncode is None:
+                process.kill()
+            raise
+        finally:
+            if not process.stdin.is_closing():
+                process.stdin.close()
+    
+    feed_task = asyncio.create_task(feed_stdin())
+    try:
+        pcm_data, stderr = await asyncio.gather(process.stdout.read(), process.stderr.read())
+        await process.wait()
+        await feed_task
+    finally:
+        if not feed_task.done():
+            feed_task.cancel()
+    
+    return process.returncode, pcm_data, stderr
+
+
+async def _convert_spooled_audio(spool) -> bytes:
+    """Convert a fully downloaded file with ffmpeg reading it from a seekable temp file."""
+    with tempfile.NamedTemporaryFile(suffix='.audio') as input_file:
+        spool.seek(0)
+        shutil.copyfileobj(spool, input_file)
+        input_file.flush()
+        
+        process = await _start_ffmpeg(input_file.name)
+        try:
+            pcm_data, stderr = await process.communicate()
+        finally:
+            await _stop_ffmpeg(process)
+    
+    if process.returncode != 0:
+        error_msg = _ffmpeg_error(process.returncode, stderr)
+        logger.error(f"ffmpeg conversion failed: {error_msg}")
+        raise AudioProcessingError(f"Audio conversion failed: {error_msg}")
+    
+    if not pcm_data:
+        raise AudioProcessingError("ffmpeg conversion produced empty output")
+    
+    logger.info(f"Converted {spool.tell()} bytes from a temp file to {len(pcm_data)} bytes of 16kHz mono PCM")
+    
+    return pcm_data
+
+
 def validate_audio_format(audio_data: bytes) -> Tuple[bool, str]:
     """
     Validate if audio data is in expected format (16kHz mono WAV).
@@ -218,7 +448,7 @@ def validate_audio_format(audio_data: bytes) -> Tuple[bool, str]:
         if channels != 1:
             return False, f"Expected mono (1 channel), got {channels} channels"
             
-        if sample_rate != 16000:
+        if sample_rate != TARGET_SAMPLE_RATE:
             return False, f"Expected 16kHz sample rate, got {sample_rate}Hz"
             
         if bits_per_sample != 16:
@@ -236,7 +466,7 @@ async def process_audio_for_enrollment(audio_url: str) -> bytes:
     """
     Complete audio processing pipeline for user enrollment.
     
-    Downloads audio from URL and converts to 16kHz mono WAV format.
+    Streams audio from URL through ffmpeg into 16kHz mono WAV format.
     
     Args:
         audio_url: URL to download audio from
@@ -250,11 +480,8 @@ async def process_audio_for_enrollment(audio_url: str) -> bytes:
     """
     logger.info(f"Starting audio processing pipeline for enrollment: {audio_url}")
     
-    # Download audio file
-    audio_data = await download_audio_file(audio_url)
-    
-    # Convert to 16kHz mono WAV
-    processed_audio = await convert_to_16khz_mono(audio_data)
+    # Download and convert to 16kHz mono WAV in one streaming pass
+    processed_audio = await stream_audio_to_16khz_mono(audio_url)
     
     # Validate the result
     is_valid, description = validate_audio_format(processed_audio)
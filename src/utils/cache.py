@@ -0,0 +1,86 @@
+"""
+In-process caching utilities.
+
+Provides a small bounded TTL cache used to keep hot values (embeddings,
+user records, health results) in memory between requests.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded LRU cache whose entries expire after a fixed time-to-live.
+
+    Intended for single-event-loop use; no locking is performed.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept (least recently used evicted first)
+            ttl: Time-to-live for each entry in seconds
+            timer: Clock used for expiry (default: time.monotonic)
+        """
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        if ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        """Return the cached value for key, or default if missing or expired."""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= self._timer():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Store value under key, evicting the least recently used entry if full."""
+        self._data[key] = (self._timer() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired entries return default)."""
+        entry = self._data.pop(key, _MISSING)
+        if entry is _MISSING or entry[0] <= self._timer():
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key, _MISSING)
+        return entry is not _MISSING and entry[0] > self._timer()
+
+    def __len__(self) -> int:
+        return len(self._data)
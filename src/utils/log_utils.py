@@ -0,0 +1,54 @@
+"""
+Logging output utilities.
+
+Provides a binary log sink that batches structlog's per-line writes into
+fewer write() syscalls.
+"""
+
+import threading
+from typing import BinaryIO
+
+
+class BufferedLogWriter:
+    """
+    Binary sink for structlog's BytesLogger that defers flushing.
+
+    BytesLogger flushes after every line, which turns each log call into a
+    write() syscall. This wrapper ignores those per-line flushes and lets the
+    underlying buffered stream fill up; call flush_buffer() periodically and at
+    shutdown so lines are never held for long.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        """
+        Initialize the writer.
+
+        Args:
+            stream: Buffered binary stream to write to (e.g. sys.stdout.buffer)
+        """
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> int:
+        """Append data to the underlying buffer."""
+        with self._lock:
+            return self._stream.write(data)
+
+    def flush(self) -> None:
+        """No-op; per-line flushes from the logger are deferred."""
+
+    def flush_buffer(self) -> None:
+        """
+        Flush buffered log lines to the underlying stream.
+
+        Safe to call at interpreter exit: a stream that is already closed, or
+        whose reader has gone away, is skipped since there is nowhere left to
+        report the failure.
+        """
+        with self._lock:
+            if self._stream.closed:
+                return
+            try:
+                self._stream.flush()
+            except (ValueError, OSError):
+                pass
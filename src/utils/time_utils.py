@@ -0,0 +1,28 @@
+"""
+Time helpers shared by API handlers and middleware.
+"""
+
+import time
+from typing import Tuple
+
+# (epoch second, formatted 'YYYY-MM-DDTHH:MM:SS') of the last call; error
+# bursts format the same second many times, so only the milliseconds change
+_last_second: Tuple[int, str] = (-1, "")
+
+
+def utc_now_iso() -> str:
+    """
+    Get the current UTC time as an ISO 8601 string with millisecond precision.
+    
+    Returns:
+        Timestamp such as '2024-01-01T12:00:00.000+00:00'
+    """
+    global _last_second
+    second, millis = divmod(time.time_ns() // 1_000_000, 1000)
+    
+    cached_second, prefix = _last_second
+    if second != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _last_second = (second, prefix)
+    
+    return f"{prefix}.{millis:03d}+00:00"
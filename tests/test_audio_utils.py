@@ -2,6 +2,7 @@
 Tests for audio processing utilities.
 """
 
+import httpx
 import pytest
 import struct
 from unittest.mock import AsyncMock, patch, MagicMock
@@ -15,6 +16,7 @@ from src.utils.audio_utils import (
     get_audio_duration,
     convert_to_16khz_mono,
     process_audio_for_enrollment,
+    stream_audio_to_16khz_mono,
 )
 
 
@@ -178,34 +180,105 @@ class TestAudioUtils:
     async def test_process_audio_for_enrollment_success(self):
         """Test complete audio processing pipeline."""
         audio_url = "https://example.com/audio.wav"
-        downloaded_data = b'fake_downloaded_audio'
         processed_data = pcm_to_wav(b'\x00\x00' * 1000, sample_rate=16000)  # Valid 16kHz mono WAV
         
-        with patch('src.utils.audio_utils.download_audio_file', new_callable=AsyncMock) as mock_download, \
-             patch('src.utils.audio_utils.convert_to_16khz_mono', new_callable=AsyncMock) as mock_convert:
-            
-            mock_download.return_value = downloaded_data
-            mock_convert.return_value = processed_data
+        with patch('src.utils.audio_utils.stream_audio_to_16khz_mono', new_callable=AsyncMock) as mock_stream:
+            mock_stream.return_value = processed_data
             
             result = await process_audio_for_enrollment(audio_url)
             
             assert result == processed_data
-            mock_download.assert_called_once_with(audio_url)
-            mock_convert.assert_called_once_with(downloaded_data)
+            mock_stream.assert_called_once_with(audio_url)
 
     @pytest.mark.asyncio
     async def test_process_audio_for_enrollment_invalid_output(self):
         """Test audio processing pipeline with invalid output format."""
         audio_url = "https://example.com/audio.wav"
-        downloaded_data = b'fake_downloaded_audio'
         # Create invalid WAV (wrong sample rate)
         invalid_wav = pcm_to_wav(b'\x00\x00' * 1000, sample_rate=44100)
         
-        with patch('src.utils.audio_utils.download_audio_file', new_callable=AsyncMock) as mock_download, \
-             patch('src.utils.audio_utils.convert_to_16khz_mono', new_callable=AsyncMock) as mock_convert:
-            
-            mock_download.return_value = downloaded_data
-            mock_convert.return_value = invalid_wav
+        with patch('src.utils.audio_utils.stream_audio_to_16khz_mono', new_callable=AsyncMock) as mock_stream:
+            mock_stream.return_value = invalid_wav
             
             with pytest.raises(AudioProcessingError, match="Processed audio validation failed"):
-                await process_audio_for_enrollment(audio_url)
\ No newline at end of file
+                await process_audio_for_enrollment(audio_url)
+
+    @pytest.mark.asyncio
+    async def test_stream_audio_to_16khz_mono_ffmpeg_missing(self):
+        """Test streaming conversion when ffmpeg is not installed."""
+        with patch('asyncio.create_subprocess_exec', new_callable=AsyncMock) as mock_exec:
+            mock_exec.side_effect = FileNotFoundError("ffmpeg")
+            
+            with pytest.raises(AudioProcessingError, match="ffmpeg executable not found"):
+                await stream_audio_to_16khz_mono("https://example.com/audio.wav")
+
+    @staticmethod
+    def _mock_download(body: bytes, content_type: str = 'application/octet-stream'):
+        """Patch httpx.AsyncClient so every request returns body."""
+        real_client = httpx.AsyncClient
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body, headers={'content-type': content_type})
+        )
+        return patch('httpx.AsyncClient', side_effect=lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    @staticmethod
+    def _file_process(pcm_data: bytes, inputs: list):
+        """Fake ffmpeg reading a file argument; records the file's contents in inputs."""
+        def spawn(*args, **kwargs):
+            input_path = args[args.index('-i') + 1]
+            with open(input_path, 'rb') as f:
+                inputs.append(f.read())
+            process = MagicMock(returncode=0)
+            process.communicate = AsyncMock(return_value=(pcm_data, b''))
+            return process
+        return spawn
+
+    @pytest.mark.asyncio
+    async def test_stream_audio_m4a_is_converted_from_temp_file(self):
+        """Test MP4-family uploads skip the pipe, since ffmpeg needs to seek to their index."""
+        body = b'ftyp-m4a-with-moov-at-end'
+        pcm_data = b'\x01\x00' * 100
+        inputs = []
+        
+        with self._mock_download(body), \
+             patch('asyncio.create_subprocess_exec', new_callable=AsyncMock) as mock_exec:
+            mock_exec.side_effect = self._file_process(pcm_data, inputs)
+            
+            result = await stream_audio_to_16khz_mono("https://example.com/recording.m4a")
+        
+        assert result[44:] == pcm_data
+        assert inputs == [body]
+        assert 'pipe:0' not in mock_exec.call_args.args
+
+    @pytest.mark.asyncio
+    async def test_stream_audio_retries_from_temp_file_when_pipe_fails(self):
+        """Test input ffmpeg cannot decode from the pipe is retried from a seekable copy."""
+        body = b'audio-ffmpeg-cannot-stream'
+        pcm_data = b'\x02\x00' * 100
+        inputs = []
+        
+        pipe_process = MagicMock(returncode=None)
+        pipe_process.stdin.is_closing.return_value = False
+        pipe_process.stdin.drain = AsyncMock()
+        pipe_process.stdout.read = AsyncMock(return_value=b'')
+        pipe_process.stderr.read = AsyncMock(return_value=b'moov atom not found')
+        
+        async def pipe_exit():
+            pipe_process.returncode = 1
+            return 1
+        pipe_process.wait = AsyncMock(side_effect=pipe_exit)
+        
+        file_spawn = self._file_process(pcm_data, inputs)
+        
+        with self._mock_download(body, content_type='audio/wav'), \
+             patch('asyncio.create_subprocess_exec', new_callable=AsyncMock) as mock_exec:
+            mock_exec.side_effect = lambda *args, **kwargs: (
+                pipe_process if 'pipe:0' in args else file_spawn(*args, **kwargs)
+            )
+            
+            result = await stream_audio_to_16khz_mono("https://example.com/audio.wav")
+        
+        assert result[44:] == pcm_data
+        assert mock_exec.call_count == 2
+        pipe_process.stdin.write.assert_called_once_with(body)
+        assert inputs == [body]
@@ -2,6 +2,7 @@
 Tests for the authentication service.
 """
 
+import asyncio
 import pytest
 import tempfile
 import numpy as np
@@ -37,8 +38,13 @@ class TestAuthenticationService:
         # Mock a valid 192-dimensional embedding
         mock_embedding = np.random.randn(192)
         embedding_service.generate_embedding.return_value = mock_embedding
+        embedding_service.generate_embedding_from_bytes.return_value = mock_embedding
         embedding_service.validate_embedding.return_value = True
         embedding_service.verify_speaker.return_value = (True, 0.95)
+        embedding_service.normalize_embedding.side_effect = (
+            lambda e: (e / np.linalg.norm(e)).astype(np.float32)
+        )
+        embedding_service.compute_cosine_similarity_batch.return_value = np.float32(0.95)
         return embedding_service
     
     @pytest.fixture
@@ -102,7 +108,7 @@ class TestAuthenticationService:
             auth_service.db.users.create_or_update_user = AsyncMock()
             
             # Execute enrollment
-            status, score = await auth_service.enroll_user(sample_user_id, sample_phone, sample_audio_url)
+            status, score, _ = await auth_service.enroll_user(sample_user_id, sample_phone, sample_audio_url)
             
             # Verify results
             assert status == "enrolled"
@@ -110,7 +116,7 @@ class TestAuthenticationService:
             
             # Verify mocks were called correctly
             mock_process_audio.assert_called_once_with(sample_audio_url)
-            auth_service.embedding_service.generate_embedding.assert_called_once()
+            auth_service.embedding_service.generate_embedding_from_bytes.assert_called_once_with(mock_audio_data)
             auth_service.embedding_service.validate_embedding.assert_called_once()
             auth_service.db.users.create_or_update_user.assert_called_once()
         
@@ -181,7 +187,7 @@ class TestAuthenticationService:
             mock_process_audio.return_value = b'fake_audio'
             mock_get_duration.return_value = 5.0
             
-            auth_service.embedding_service.generate_embedding.side_effect = Exception("Embedding failed")
+            auth_service.embedding_service.generate_embedding_from_bytes.side_effect = Exception("Embedding failed")
             
             with pytest.raises(EnrollmentError, match="Failed to generate voice embedding"):
                 await auth_service.enroll_user(sample_user_id, sample_phone, sample_audio_url)
@@ -210,6 +216,83 @@ class TestAuthenticationService:
     class TestVerification:
         """Tests for user verification workflow."""
         
+        @pytest.mark.asyncio
+        async def test_verify_user_streams_live_audio(self, auth_service, sample_phone, sample_listen_url):
+            """Test live PCM chunks are decoded and embedded without a WAV round trip."""
+            stored = np.random.randn(192)
+            auth_service.db.users.get_user_by_phone = AsyncMock(
+                return_value=User(phone=sample_phone, embedding=stored, enrolled_at=datetime.utcnow())
+            )
+            auth_service.db.auth_attempts.create_auth_attempt = AsyncMock()
+            auth_service.embedding_service.generate_embedding_from_waveform.return_value = np.random.randn(192)
+            
+            async def fake_stream(**kwargs):
+                for _ in range(4):
+                    yield b'\x00\x10' * 8000  # 0.5 s of 16kHz PCM per chunk
+            
+            with patch('src.services.auth_service.stream_audio_from_vapi', side_effect=fake_stream):
+                success, message, score = await auth_service.verify_user(sample_phone, sample_listen_url)
+            
+            assert success is True
+            assert score == pytest.approx(0.95)
+            waveform = auth_service.embedding_service.generate_embedding_from_waveform.call_args[0][0]
+            assert waveform.dtype == np.float32
+            assert waveform.shape == (32000,)
+            auth_service.embedding_service.generate_embedding.assert_not_called()
+        
+        @pytest.mark.asyncio
+        async def test_verify_user_early_accept_stops_capture(self, auth_service, sample_phone, sample_listen_url):
+            """Test a confident partial embedding ends capture at the first checkpoint."""
+            auth_service.db.users.get_user_by_phone = AsyncMock(
+                return_value=User(phone=sample_phone, embedding=np.random.randn(192), enrolled_at=datetime.utcnow())
+            )
+            auth_service.db.auth_attempts.create_auth_attempt = AsyncMock()
+            auth_service.embedding_service.generate_embedding_from_waveform.return_value = np.random.randn(192)
+            chunks_sent = 0
+            
+            async def fake_stream(**kwargs):
+                nonlocal chunks_sent
+                for _ in range(10):
+                    chunks_sent += 1
+                    yield b'\x00\x10' * 8000  # 0.5 s of 16kHz PCM per chunk
+            
+            with patch('src.services.auth_service.stream_audio_from_vapi', side_effect=fake_stream), \
+                 patch('src.services.auth_service.settings') as mock_settings:
+                mock_settings.early_decision_enabled = True
+                mock_settings.early_decision_checkpoints = [1.0, 1.5]
+                mock_settings.early_accept_threshold = 0.90
+                mock_settings.early_reject_threshold = 0.40
+                
+                success, message, score = await auth_service.verify_user(sample_phone, sample_listen_url)
+            
+            assert success is True
+            assert chunks_sent == 2
+            auth_service.embedding_service.generate_embedding_from_waveform.assert_called_once()
+
+        @pytest.mark.asyncio
+        async def test_verify_user_not_enrolled_stops_capture(self, auth_service, sample_phone, sample_listen_url):
+            """Test capture stops once the concurrent user lookup finds no enrollment."""
+            auth_service.db.users.get_user_by_phone = AsyncMock(return_value=None)
+            auth_service._log_auth_attempt = AsyncMock()
+            chunks_sent = 0
+
+            async def fake_stream(**kwargs):
+                nonlocal chunks_sent
+                for _ in range(10):
+                    await asyncio.sleep(0)  # network read; lets the lookup task run
+                    chunks_sent += 1
+                    yield b'\x00\x10' * 8000  # 0.5 s of 16kHz PCM per chunk
+
+            with patch('src.services.auth_service.stream_audio_from_vapi', side_effect=fake_stream):
+                success, message, score = await auth_service.verify_user(sample_phone, sample_listen_url)
+
+            assert success is False
+            assert "not enrolled" in message.lower()
+            assert score is None
+            assert chunks_sent < 10
+            auth_service._log_auth_attempt.assert_called_once_with(sample_phone, False, 0.0)
+            auth_service.embedding_service.generate_embedding_from_waveform.assert_not_called()
+
         @patch('src.services.auth_service.capture_audio_from_vapi')
         @patch('src.services.auth_service.get_audio_duration')
         @pytest.mark.asyncio
@@ -332,6 +415,122 @@ class TestAuthenticationService:
             assert score == 0.75
             auth_service._log_auth_attempt.assert_called_once_with(sample_user.id, False, 0.75)
 
+    class TestEmbeddingCaches:
+        """Tests for the in-process embedding caches."""
+        
+        @pytest.mark.asyncio
+        async def test_get_user_embedding_cached_after_first_fetch(self, auth_service, sample_phone):
+            """Test enrolled embedding is fetched from the database only once."""
+            stored = np.random.randn(192)
+            auth_service.db.users.get_user_by_phone = AsyncMock(
+                return_value=User(phone=sample_phone, embedding=stored, enrolled_at=datetime.utcnow())
+            )
+            
+            first = await auth_service._get_user_embedding(sample_phone)
+            second = await auth_service._get_user_embedding(sample_phone)
+            
+            auth_service.db.users.get_user_by_phone.assert_called_once_with(sample_phone)
+            assert first.dtype == np.float32
+            assert second.dtype == np.float32
+            np.testing.assert_allclose(second, stored / np.linalg.norm(stored), atol=1e-3)
+        
+        @pytest.mark.asyncio
+        async def test_get_user_embedding_not_enrolled_not_cached(self, auth_service, sample_phone):
+            """Test missing users are not cached."""
+            auth_service.db.users.get_user_by_phone = AsyncMock(return_value=None)
+            
+            assert await auth_service._get_user_embedding(sample_phone) is None
+            assert await auth_service._get_user_embedding(sample_phone) is None
+            assert auth_service.db.users.get_user_by_phone.call_count == 2
+
+        @pytest.mark.asyncio
+        async def test_get_user_embedding_concurrent_misses_share_fetch(self, auth_service, sample_phone):
+            """Test concurrent lookups for the same user issue one database fetch."""
+            stored = np.random.randn(192)
+
+            async def slow_fetch(phone):
+                await asyncio.sleep(0.01)
+                return User(phone=phone, embedding=stored, enrolled_at=datetime.utcnow())
+
+            auth_service.db.users.get_user_by_phone = AsyncMock(side_effect=slow_fetch)
+
+            results = await asyncio.gather(*(auth_service._get_user_embedding(sample_phone) for _ in range(5)))
+
+            auth_service.db.users.get_user_by_phone.assert_called_once_with(sample_phone)
+            for result in results:
+                np.testing.assert_allclose(result, stored / np.linalg.norm(stored), atol=1e-6)
+            assert not auth_service._user_embedding_fetches
+
+        @pytest.mark.asyncio
+        @patch('src.services.auth_service.process_audio_for_enrollment')
+        async def test_in_flight_fetch_does_not_overwrite_enrollment(self, mock_process_audio, auth_service,
+                                                                     sample_phone, sample_audio_url):
+            """Test a lookup that read the old embedding doesn't replace a newer enrollment in the cache."""
+            from src.utils.audio_utils import pcm_to_wav
+            old_embedding = np.random.randn(192)
+            new_embedding = np.random.randn(192)
+            release_fetch = asyncio.Event()
+
+            async def slow_fetch(phone):
+                await release_fetch.wait()
+                return User(phone=phone, embedding=old_embedding, enrolled_at=datetime.utcnow())
+
+            auth_service.db.users.get_user_by_phone = AsyncMock(side_effect=slow_fetch)
+            auth_service.db.users.create_or_update_user = AsyncMock()
+            auth_service.embedding_service.generate_embedding_from_bytes.return_value = new_embedding
+            mock_process_audio.return_value = pcm_to_wav(b'\x00\x01' * 16000 * 4)
+
+            lookup = asyncio.create_task(auth_service._get_user_embedding(sample_phone))
+            await asyncio.sleep(0)
+            await auth_service.enroll_user(sample_phone, sample_audio_url)
+            release_fetch.set()
+            await lookup
+
+            cached = await auth_service._get_user_embedding(sample_phone)
+            np.testing.assert_allclose(cached, new_embedding / np.linalg.norm(new_embedding), atol=1e-3)
+
+        @pytest.mark.asyncio
+        @patch('src.services.auth_service.process_audio_for_enrollment')
+        async def test_enroll_user_reuses_cached_embedding(self, mock_process_audio, auth_service,
+                                                           sample_phone, sample_audio_url):
+            """Test re-enrolling with the same audio URL skips audio processing."""
+            from src.utils.audio_utils import pcm_to_wav
+            mock_process_audio.return_value = pcm_to_wav(b'\x00\x01' * 16000 * 4)
+            auth_service.db.users.create_or_update_user = AsyncMock()
+            auth_service.db.users.get_user_by_phone = AsyncMock()
+            
+            _, _, first_hit = await auth_service.enroll_user(sample_phone, sample_audio_url)
+            _, _, second_hit = await auth_service.enroll_user(sample_phone, sample_audio_url)
+            
+            assert not first_hit
+            assert second_hit
+            
+            mock_process_audio.assert_called_once_with(sample_audio_url)
+            auth_service.embedding_service.generate_embedding_from_bytes.assert_called_once()
+            assert auth_service.db.users.create_or_update_user.call_count == 2
+            
+            # Enrollment primes the verification cache
+            await auth_service._get_user_embedding(sample_phone)
+            auth_service.db.users.get_user_by_phone.assert_not_called()
+    
+        @pytest.mark.asyncio
+        @patch('src.services.auth_service.process_audio_for_enrollment')
+        async def test_enroll_user_redownloads_after_url_entry_expires(self, mock_process_audio, auth_service,
+                                                                       sample_phone, sample_audio_url):
+            """Test an expired URL entry re-fetches the audio, in case the object behind the URL changed."""
+            from src.utils.audio_utils import pcm_to_wav
+            mock_process_audio.return_value = pcm_to_wav(b'\x00\x01' * 16000 * 4)
+            auth_service.db.users.create_or_update_user = AsyncMock()
+            
+            await auth_service.enroll_user(sample_phone, sample_audio_url)
+            auth_service._enrollment_url_cache.clear()
+            _, _, cache_hit = await auth_service.enroll_user(sample_phone, sample_audio_url)
+            
+            assert not cache_hit
+            assert mock_process_audio.call_count == 2
+            # Same content, so the embedding itself is still reused
+            auth_service.embedding_service.generate_embedding_from_bytes.assert_called_once()
+    
     class TestUtilityMethods:
         """Tests for utility methods."""
         
@@ -355,7 +554,17 @@ class TestAuthenticationService:
             
             # Should not raise exception
             await auth_service._log_auth_attempt(sample_user_id, False, 0.5)
-        
+
+        @pytest.mark.asyncio
+        async def test_log_auth_attempt_clamps_negative_score(self, auth_service, sample_phone):
+            """Test a negative similarity is queued as 0.0 instead of being dropped."""
+            auth_service.db.auth_attempts.enqueue_auth_attempt = Mock()
+
+            await auth_service._log_auth_attempt(sample_phone, False, -0.2)
+
+            queued = auth_service.db.auth_attempts.enqueue_auth_attempt.call_args[0][0]
+            assert queued.score == 0.0
+
         @pytest.mark.asyncio
         async def test_get_user_auth_history(self, auth_service, sample_user_id):
             """Test getting user authentication history."""
@@ -440,7 +649,8 @@ class TestIntegration:
         stored_embedding = np.random.randn(192)
         live_embedding = stored_embedding + 0.01 * np.random.randn(192)  # Very similar
         
-        mock_embedding_service.generate_embedding.side_effect = [stored_embedding, live_embedding]
+        mock_embedding_service.generate_embedding_from_bytes.return_value = stored_embedding
+        mock_embedding_service.generate_embedding.return_value = live_embedding
         mock_embedding_service.validate_embedding.return_value = True
         mock_embedding_service.verify_speaker.return_value = (True, 0.95)
         auth_service.embedding_service = mock_embedding_service
@@ -461,7 +671,7 @@ class TestIntegration:
         auth_service.db.auth_attempts.create_auth_attempt = AsyncMock()
         
         # Step 1: Enrollment
-        status, score = await auth_service.enroll_user(user_id, phone, audio_url)
+        status, score, _ = await auth_service.enroll_user(user_id, phone, audio_url)
         assert status == "enrolled"
         assert score == 1.0
         
@@ -471,7 +681,8 @@ class TestIntegration:
         assert similarity_score == 0.95
         
         # Verify all components were called
-        assert mock_embedding_service.generate_embedding.call_count == 2
+        mock_embedding_service.generate_embedding_from_bytes.assert_called_once_with(b'processed_audio')
+        assert mock_embedding_service.generate_embedding.call_count == 1
         assert mock_embedding_service.verify_speaker.call_count == 1
         auth_service.db.users.create_or_update_user.assert_called_once()
         auth_service.db.users.get_user_by_id.assert_called_once()
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Tests for in-process caching utilities.
+"""
+
+import pytest
+
+from src.utils.cache import TTLCache
+
+
+class FakeTimer:
+    """Manually advanced clock for expiry tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test cases for TTLCache."""
+
+    def test_set_and_get(self):
+        """Test storing and retrieving a value."""
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert "a" in cache
+        assert len(cache) == 1
+
+    def test_get_missing_returns_default(self):
+        """Test default is returned for missing keys."""
+        cache = TTLCache(maxsize=2, ttl=10)
+
+        assert cache.get("missing") is None
+        assert cache.get("missing", 42) == 42
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has elapsed."""
+        timer = FakeTimer()
+        cache = TTLCache(maxsize=2, ttl=5, timer=timer)
+        cache.set("a", 1)
+
+        timer.now = 4.9
+        assert cache.get("a") == 1
+
+        timer.now = 5.0
+        assert "a" not in cache
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted when full."""
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" becomes least recently used
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_pop(self):
+        """Test pop removes entries and returns their value."""
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+
+        assert cache.pop("a") == 1
+        assert cache.pop("a") is None
+        assert "a" not in cache
+
+    def test_clear(self):
+        """Test clear removes all entries."""
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.clear()
+
+        assert len(cache) == 0
+
+    def test_invalid_parameters(self):
+        """Test invalid size and TTL are rejected."""
+        with pytest.raises(ValueError):
+            TTLCache(maxsize=0, ttl=10)
+        with pytest.raises(ValueError):
+            TTLCache(maxsize=1, ttl=0)
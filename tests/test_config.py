@@ -0,0 +1,23 @@
+"""
+Tests for application settings.
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from src.config import Settings
+
+
+class TestEarlyDecisionThresholds:
+    """Tests for the early decision threshold validation."""
+    
+    def test_high_voice_threshold_allowed_when_disabled(self):
+        """Test a threshold above the early accept bound loads with the feature off."""
+        settings = Settings(voice_threshold=0.95, early_decision_enabled=False)
+        
+        assert settings.voice_threshold == 0.95
+    
+    def test_threshold_outside_bounds_rejected_when_enabled(self):
+        """Test the ordering is enforced when early decisions are on."""
+        with pytest.raises(ValidationError, match="EARLY_REJECT_THRESHOLD"):
+            Settings(voice_threshold=0.95, early_decision_enabled=True)
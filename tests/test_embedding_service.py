@@ -10,7 +10,7 @@ import torch
 import torchaudio
 from unittest.mock import Mock, patch, MagicMock
 
-from src.services.embedding_service import EmbeddingService, get_embedding_service
+from src.services.embedding_service import EmbeddingBatcher, EmbeddingService, get_embedding_service
 
 
 class TestEmbeddingService:
@@ -96,7 +96,46 @@ class TestEmbeddingService:
         
         assert not embedding_service._model_loaded
         assert embedding_service.model is None
-    
+
+    def test_optimize_embedding_model_falls_back_to_eager(self, embedding_service):
+        """Test a failed trace leaves the eager encoder in place."""
+        eager_encoder = Mock()
+        embedding_service.model = Mock()
+        embedding_service.model.mods.embedding_model = eager_encoder
+        eager_encoder.eval.return_value = eager_encoder
+        embedding_service.model.mods.compute_features.side_effect = RuntimeError("trace failed")
+
+        embedding_service._optimize_embedding_model()
+
+        assert embedding_service.model.mods.embedding_model is eager_encoder
+
+    def test_frozen_model_path_tracks_checkpoint(self, embedding_service):
+        """Test the TorchScript cache name changes with the checkpoint contents."""
+        checkpoint = os.path.join(embedding_service.model_cache_dir, "embedding_model.ckpt")
+        assert embedding_service._frozen_model_path() is None
+
+        with open(checkpoint, "wb") as f:
+            f.write(b"weights v1")
+        first = embedding_service._frozen_model_path()
+        with open(checkpoint, "wb") as f:
+            f.write(b"weights v2")
+        second = embedding_service._frozen_model_path()
+
+        assert first != second
+        assert torch.__version__ in first.name
+
+    @pytest.mark.filterwarnings("ignore:`torch.jit:FutureWarning")
+    def test_save_frozen_model_leaves_no_partial_file(self, embedding_service):
+        """Test the frozen encoder is written via a temp file and renamed into place."""
+        from pathlib import Path
+        frozen = torch.jit.freeze(torch.jit.script(torch.nn.Linear(2, 2).eval()))
+        cache_path = Path(embedding_service.model_cache_dir) / "frozen.pt"
+
+        embedding_service._save_frozen_model(frozen, cache_path)
+
+        assert os.listdir(embedding_service.model_cache_dir) == ["frozen.pt"]
+        assert torch.jit.load(str(cache_path))(torch.ones(1, 2)).shape == (1, 2)
+
     @patch('src.services.embedding_service.EncoderClassifier')
     @patch('src.services.embedding_service.torchaudio.load')
     def test_generate_embedding_success(self, mock_load, mock_encoder_class, 
@@ -166,6 +205,69 @@ class TestEmbeddingService:
         assert isinstance(embedding, np.ndarray)
         assert embedding.shape == (192,)
     
+    @patch('src.services.embedding_service.EncoderClassifier')
+    def test_generate_embedding_from_bytes(self, mock_encoder_class, embedding_service, mock_model):
+        """Test embedding generation from in-memory WAV bytes."""
+        from src.utils.audio_utils import pcm_to_wav
+        
+        mock_encoder_class.from_hparams.return_value = mock_model
+        pcm = (np.arange(16000, dtype=np.int16) - 8000).tobytes()
+        
+        embedding = embedding_service.generate_embedding_from_bytes(pcm_to_wav(pcm))
+        
+        assert embedding.shape == (192,)
+        waveform = mock_model.encode_batch.call_args[0][0]
+        assert waveform.shape == (1, 16000)
+        assert waveform[0, 0].item() == pytest.approx(-8000 / 32768.0)
+    
+    @patch('src.services.embedding_service.EncoderClassifier')
+    def test_generate_embeddings_from_waveforms(self, mock_encoder_class, embedding_service, mock_model):
+        """Test batched embedding pads waveforms and passes relative lengths."""
+        mock_encoder_class.from_hparams.return_value = mock_model
+        mock_model.encode_batch.return_value = torch.randn(2, 1, 192)
+        waveforms = [np.ones(16000, dtype=np.float32), np.ones(8000, dtype=np.float32)]
+        
+        embeddings = embedding_service.generate_embeddings_from_waveforms(waveforms)
+        
+        assert len(embeddings) == 2
+        assert all(e.shape == (192,) for e in embeddings)
+        assert all(np.linalg.norm(e) == pytest.approx(1.0, abs=1e-5) for e in embeddings)
+        batch, lengths = mock_model.encode_batch.call_args[0]
+        assert batch.shape == (2, 16000)
+        assert batch[1, 8000:].abs().sum() == 0
+        assert lengths.tolist() == [1.0, 0.5]
+    
+    def test_generate_embedding_from_bytes_invalid(self, embedding_service):
+        """Test non-WAV bytes are rejected with ValueError."""
+        with pytest.raises(ValueError, match="Invalid WAV audio"):
+            embedding_service.generate_embedding_from_bytes(b'not a wav file')
+    
+    @patch('src.services.embedding_service.EncoderClassifier')
+    def test_warmup(self, mock_encoder_class, embedding_service, mock_model):
+        """Test warm-up loads the model and runs a dummy forward pass."""
+        mock_encoder_class.from_hparams.return_value = mock_model
+        
+        embedding_service.warmup()
+        
+        assert embedding_service._model_loaded
+        mock_model.encode_batch.assert_called_once()
+        assert mock_model.encode_batch.call_args[0][0].shape == (1, 16000)
+
+    @patch('src.services.embedding_service.EncoderClassifier')
+    def test_bf16_autocast_returns_float32(self, mock_encoder_class, mock_model):
+        """Test embeddings from a bfloat16 forward pass come back as float32."""
+        mock_encoder_class.from_hparams.return_value = mock_model
+        mock_model.encode_batch.side_effect = lambda *args: (
+            torch.randn(1, 1, 192).to(torch.bfloat16) if torch.is_autocast_enabled('cpu') else torch.randn(1, 1, 192)
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            service = EmbeddingService(model_cache_dir=temp_dir, bf16_autocast=True)
+
+            embedding = service.generate_embedding_from_waveform(np.ones(16000, dtype=np.float32))
+
+        assert embedding.dtype == np.float32
+        assert embedding.shape == (192,)
+
     def test_compute_cosine_similarity_success(self, embedding_service):
         """Test successful cosine similarity computation."""
         # Create two similar embeddings
@@ -186,6 +288,15 @@ class TestEmbeddingService:
         
         assert abs(similarity - 1.0) < 1e-6  # Should be very close to 1.0
     
+    def test_compute_cosine_similarity_assume_normalized(self, embedding_service):
+        """Test the single-dot-product path matches the full computation on unit vectors."""
+        embedding1 = embedding_service.normalize_embedding(np.random.randn(192))
+        embedding2 = embedding_service.normalize_embedding(np.random.randn(192))
+        
+        similarity = embedding_service.compute_cosine_similarity(embedding1, embedding2, assume_normalized=True)
+        
+        assert similarity == pytest.approx(embedding_service.compute_cosine_similarity(embedding1, embedding2), abs=1e-6)
+    
     def test_compute_cosine_similarity_orthogonal(self, embedding_service):
         """Test cosine similarity with orthogonal embeddings."""
         embedding1 = np.zeros(192)
@@ -221,6 +332,23 @@ class TestEmbeddingService:
         with pytest.raises(ValueError, match="Cannot compute similarity with zero-norm embedding"):
             embedding_service.compute_cosine_similarity(embedding1, embedding2)
     
+    def test_compute_cosine_similarity_batch_matches_pairwise(self, embedding_service):
+        """Test batch scoring against normalized embeddings matches pairwise cosine."""
+        enrolled = np.random.randn(5, 192)
+        live = np.random.randn(192)
+        normalized = np.stack([embedding_service.normalize_embedding(e) for e in enrolled])
+        
+        scores = embedding_service.compute_cosine_similarity_batch(normalized, live)
+        
+        assert scores.shape == (5,)
+        for score, emb in zip(scores, enrolled):
+            assert abs(score - embedding_service.compute_cosine_similarity(emb, live)) < 1e-5
+    
+    def test_normalize_embedding_zero_norm(self, embedding_service):
+        """Test normalizing a zero embedding raises ValueError."""
+        with pytest.raises(ValueError, match="zero-norm"):
+            embedding_service.normalize_embedding(np.zeros(192))
+    
     def test_verify_speaker_same_speaker(self, embedding_service):
         """Test speaker verification with same speaker."""
         embedding = np.random.randn(192)
@@ -356,4 +484,41 @@ class TestGlobalEmbeddingService:
         """Test that get_embedding_service creates new instance when needed."""
         service = get_embedding_service()
         
-        assert isinstance(service, EmbeddingService)
\ No newline at end of file
+        assert isinstance(service, EmbeddingService)
+
+class TestEmbeddingBatcher:
+    """Test cases for EmbeddingBatcher."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        """Test requests queued together are embedded in a single call."""
+        from concurrent.futures import ThreadPoolExecutor
+        import asyncio
+        
+        service = Mock()
+        service.generate_embeddings_from_waveforms.side_effect = (
+            lambda waveforms, sample_rate: [np.full(192, len(w), dtype=np.float32) for w in waveforms]
+        )
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = EmbeddingBatcher(service, executor, max_batch_size=4, max_wait=0.05)
+            results = await asyncio.gather(
+                batcher.embed(np.zeros(16000, dtype=np.float32)),
+                batcher.embed(np.zeros(24000, dtype=np.float32))
+            )
+            await batcher.close()
+        
+        service.generate_embeddings_from_waveforms.assert_called_once()
+        assert results[0][0] == 16000
+        assert results[1][0] == 24000
+    
+    @pytest.mark.asyncio
+    async def test_short_waveform_rejected_without_batching(self):
+        """Test a too-short clip fails on its own without reaching the model."""
+        service = Mock()
+        batcher = EmbeddingBatcher(service, executor=None)
+        
+        with pytest.raises(ValueError, match="too short"):
+            await batcher.embed(np.zeros(100, dtype=np.float32))
+        
+        service.generate_embeddings_from_waveforms.assert_not_called()
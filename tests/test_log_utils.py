@@ -0,0 +1,45 @@
+"""
+Tests for logging output utilities.
+"""
+
+import io
+from unittest.mock import Mock
+
+from src.utils.log_utils import BufferedLogWriter
+
+
+class TestBufferedLogWriter:
+    """Test cases for BufferedLogWriter."""
+
+    def test_per_line_flush_is_deferred(self):
+        """Test writes stay buffered until flush_buffer is called."""
+        raw = io.BytesIO()
+        stream = io.BufferedWriter(raw, buffer_size=8192)
+        writer = BufferedLogWriter(stream)
+        
+        writer.write(b'{"event":"one"}\n')
+        writer.flush()
+        writer.write(b'{"event":"two"}\n')
+        writer.flush()
+        
+        assert raw.getvalue() == b''
+        
+        writer.flush_buffer()
+        
+        assert raw.getvalue() == b'{"event":"one"}\n{"event":"two"}\n'
+
+    def test_flush_buffer_after_close_is_noop(self):
+        """Test the atexit flush does not raise once the stream is closed."""
+        stream = io.BufferedWriter(io.BytesIO())
+        writer = BufferedLogWriter(stream)
+        stream.close()
+        
+        writer.flush_buffer()
+
+    def test_flush_buffer_ignores_broken_pipe(self):
+        """Test a reader going away does not raise from flush_buffer."""
+        stream = Mock(closed=False)
+        stream.flush.side_effect = BrokenPipeError()
+        writer = BufferedLogWriter(stream)
+        
+        writer.flush_buffer()
@@ -0,0 +1,103 @@
+"""
+Tests for the Supabase client helpers and repositories.
+"""
+
+import asyncio
+import numpy as np
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock
+
+from postgrest.exceptions import APIError
+
+from src.clients.supabase_client import (
+    AuthAttemptRepository,
+    _decode_quantized_embedding,
+    _encode_quantized_embedding
+)
+from src.models.internal_models import AuthAttempt
+
+
+class TestQuantizedEmbedding:
+    """Tests for the int8 embedding column codec."""
+
+    def test_round_trip_preserves_direction(self):
+        """Test a quantized embedding decodes to (nearly) the same direction."""
+        embedding = np.random.randn(192).astype(np.float32)
+        columns = _encode_quantized_embedding(embedding)
+
+        decoded = _decode_quantized_embedding(columns["embedding_int8"], columns["embedding_scale"])
+
+        assert decoded.dtype == np.float32
+        assert decoded.shape == (192,)
+        cosine = decoded @ embedding / (np.linalg.norm(decoded) * np.linalg.norm(embedding))
+        assert cosine > 0.999
+
+    def test_decode_rejects_wrong_length(self):
+        """Test a truncated column value fails instead of yielding a short embedding."""
+        with pytest.raises(ValueError, match="192 bytes"):
+            _decode_quantized_embedding(bytes(191), 0.01)
+
+
+class TestAuthAttemptRepository:
+    """Tests for batched auth attempt writes."""
+
+    @pytest.fixture
+    def repository(self):
+        """Create a repository with a mock Supabase client."""
+        return AuthAttemptRepository(Mock())
+
+    @pytest.fixture
+    def attempts(self):
+        """A batch of three attempts."""
+        return [AuthAttempt(phone=f"+100000000{i}", success=False, score=0.5) for i in range(3)]
+
+    @pytest.mark.asyncio
+    async def test_write_batch_retries_rows_after_bad_row(self, repository, attempts):
+        """Test one rejected row does not discard the rest of the batch."""
+        bad_row = APIError({"code": "23514", "message": "check constraint violated"})
+        repository.create_auth_attempts = AsyncMock(side_effect=[bad_row, None, bad_row, None])
+
+        await repository._write_batch(attempts)
+
+        calls = repository.create_auth_attempts.call_args_list
+        assert len(calls) == 4
+        assert [call.args[0] for call in calls[1:]] == [[attempt] for attempt in attempts]
+
+    @pytest.mark.asyncio
+    async def test_write_batch_stops_retrying_when_database_unreachable(self, repository, attempts):
+        """Test a retryable failure during row-by-row retry stops further attempts."""
+        repository.create_auth_attempts = AsyncMock(side_effect=ConnectionError("down"))
+
+        await repository._write_batch(attempts)
+
+        assert repository.create_auth_attempts.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_create_auth_attempts_rows_share_columns(self, repository, attempts):
+        """Test a mixed batch gets created_at on every row so none is inserted as NULL."""
+        attempts[0].created_at = datetime.now(timezone.utc)
+        repository.client.execute = AsyncMock()
+
+        await repository.create_auth_attempts(attempts)
+
+        rows = repository.client.client.table.return_value.insert.call_args[0][0]
+        assert all("created_at" in row for row in rows)
+        assert repository.client.client.table.return_value.insert.call_args.kwargs == {}
+
+    @pytest.mark.asyncio
+    async def test_flush_loop_writes_every_attempt_across_intervals(self, repository, attempts):
+        """Test attempts queued before, during and after a flush interval are each written once."""
+        written = []
+        repository.create_auth_attempts = AsyncMock(side_effect=lambda batch: written.extend(batch))
+        repository._flush_interval = 0.01
+        repository._batch_size = 2
+        
+        repository.enqueue_auth_attempt(attempts[0])
+        await asyncio.sleep(0.05)
+        repository.enqueue_auth_attempt(attempts[1])
+        repository.enqueue_auth_attempt(attempts[2])
+        await repository.close()
+        
+        assert written == attempts
+        assert all(len(call.args[0]) <= 2 for call in repository.create_auth_attempts.call_args_list)
@@ -0,0 +1,27 @@
+"""
+Tests for time helpers.
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from src.utils.time_utils import utc_now_iso
+
+
+class TestUtcNowIso:
+    """Test cases for utc_now_iso."""
+
+    def test_matches_datetime_isoformat(self):
+        """Test output matches datetime's millisecond ISO format."""
+        now_ns = 1_700_000_000_123_456_789
+        expected = datetime.fromtimestamp(now_ns / 1e9, tz=timezone.utc).isoformat(timespec="milliseconds")
+        
+        with patch("src.utils.time_utils.time.time_ns", return_value=now_ns):
+            assert utc_now_iso() == expected == "2023-11-14T22:13:20.123+00:00"
+
+    def test_second_rollover(self):
+        """Test a cached second is not reused after the clock moves on."""
+        with patch("src.utils.time_utils.time.time_ns", return_value=1_700_000_000_999_000_000):
+            assert utc_now_iso() == "2023-11-14T22:13:20.999+00:00"
+        with patch("src.utils.time_utils.time.time_ns", return_value=1_700_000_001_000_000_000):
+            assert utc_now_iso() == "2023-11-14T22:13:21.000+00:00"
@@ -63,13 +63,31 @@ class TestVAPIWebSocketClient:
         is_silence = client._detect_silence(b'')
         assert is_silence is True
 
+    def test_detect_silence_odd_length_chunk(self):
+        """Test a trailing partial sample doesn't break silence detection."""
+        client = VAPIWebSocketClient("ws://example.com/listen")
+        
+        loud_audio = np.full(100, 10000, dtype=np.int16).tobytes() + b'\x01'
+        
+        assert client._detect_silence(loud_audio) is False
+        assert client._detect_silence(b'\x00' * 201) is True
+
+    def test_mean_square_kernel_matches_numpy(self):
+        """Test the silence energy kernel agrees with the numpy reference."""
+        from src.clients.vapi_client import _mean_square, _mean_square_numpy
+        
+        samples = np.random.randint(-32768, 32767, 320, dtype=np.int16)
+        view = np.frombuffer(samples.tobytes(), dtype=np.int16)
+        
+        assert _mean_square(view) == pytest.approx(_mean_square_numpy(view))
+
     def test_should_stop_capture_max_duration(self):
         """Test capture stop condition based on maximum duration."""
         client = VAPIWebSocketClient("ws://example.com/listen", max_audio_duration=1.0)
         
         # Simulate capture start
         import time
-        client.capture_start_time = time.time() - 2.0  # 2 seconds ago
+        client.capture_start_time = time.monotonic() - 2.0  # 2 seconds ago
         
         should_stop = client._should_stop_capture()
         assert should_stop is True
@@ -80,7 +98,7 @@ class TestVAPIWebSocketClient:
         
         # Simulate silence start
         import time
-        client.silence_start_time = time.time() - 2.0  # 2 seconds ago
+        client.silence_start_time = time.monotonic() - 2.0  # 2 seconds ago
         
         should_stop = client._should_stop_capture()
         assert should_stop is True
@@ -107,8 +125,30 @@ class TestVAPIWebSocketClient:
         should_continue = await client._process_audio_message(message)
         
         assert should_continue is True
-        assert len(client.audio_buffer) == 1
-        assert client.audio_buffer[0] == audio_data
+        assert client.audio_buffer == audio_data
+
+    @pytest.mark.asyncio
+    async def test_process_audio_message_binary_frame(self):
+        """Test processing raw PCM delivered as a binary frame."""
+        client = VAPIWebSocketClient("ws://example.com/listen")
+        
+        audio_data = np.random.randint(-1000, 1000, 100, dtype=np.int16).tobytes()
+        
+        should_continue = await client._process_audio_message(audio_data)
+        
+        assert should_continue is True
+        assert client.audio_buffer == audio_data
+        assert client.silence_start_time is None
+
+    @pytest.mark.asyncio
+    async def test_process_audio_message_stops_at_byte_ceiling(self):
+        """Test capture stops once buffered audio reaches the byte ceiling."""
+        client = VAPIWebSocketClient("ws://example.com/listen", max_audio_duration=0.1)
+        chunk = np.full(1000, 5000, dtype=np.int16).tobytes()  # 2000 bytes
+        
+        assert await client._process_audio_message(chunk) is True
+        assert await client._process_audio_message(chunk) is False
+        assert len(client.audio_buffer) == client._max_bytes == 3520
 
     @pytest.mark.asyncio
     async def test_process_audio_message_no_audio(self):
@@ -218,6 +258,31 @@ class TestVAPIWebSocketClient:
             assert not client.is_capturing
             mock_pcm_to_wav.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_stream_audio_yields_chunks(self):
+        """Test streaming capture yields each audio chunk as it arrives."""
+        client = VAPIWebSocketClient("ws://example.com/listen")
+        
+        chunks = [b'\x00\x00' * 100, b'\x01\x00' * 100]
+        messages = [json.dumps({"audio": base64.b64encode(c).decode()}) for c in chunks]
+        messages.insert(1, json.dumps({"type": "status"}))
+        
+        async def mock_aiter(self):
+            for message in messages:
+                yield message
+        
+        mock_websocket = MagicMock()
+        mock_websocket.__aiter__ = mock_aiter
+        
+        client.websocket = mock_websocket
+        client.is_connected = True
+        
+        received = [chunk async for chunk in client.stream_audio(min_duration=0.0)]
+        
+        assert received == chunks
+        assert client.audio_buffer == b''.join(chunks)
+        assert not client.is_capturing
+
     @pytest.mark.asyncio
     async def test_capture_audio_no_data(self):
         """Test audio capture with no audio data."""
@@ -0,0 +1,46 @@
+"""
+Tests for the VAPI webhook handler.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.vapi_webhook import _parse_vapi_payload, router
+
+
+class TestParseVapiPayload:
+    """Test cases for VAPI payload extraction."""
+
+    def test_extracts_phone_and_listen_url(self):
+        """Test phone and listen URL are read from message.call."""
+        payload = {
+            "message": {
+                "call": {
+                    "customer": {"number": "+15551234567"},
+                    "monitor": {"listenUrl": "wss://example.com/listen"}
+                }
+            }
+        }
+        
+        assert _parse_vapi_payload(payload) == ("+15551234567", "wss://example.com/listen")
+
+    @pytest.mark.parametrize("payload", [
+        {"message": "x"},
+        {"message": ["x"]},
+        {"message": {"call": "x", "customer": 1}},
+        {"message": {"call": {"customer": "x", "monitor": ["x"]}}},
+    ])
+    def test_non_object_fields_are_treated_as_missing(self, payload):
+        """Test fields of the wrong JSON type yield None instead of raising."""
+        assert _parse_vapi_payload(payload) == (None, None)
+
+    def test_malformed_message_returns_400(self):
+        """Test a non-object message gets MissingPhoneNumber rather than a 500."""
+        app = FastAPI()
+        app.include_router(router)
+        
+        response = TestClient(app).post("/api/v1/vapi-webhook", json={"message": "x"})
+        
+        assert response.status_code == 400
+        assert response.json()["error"] == "MissingPhoneNumber"